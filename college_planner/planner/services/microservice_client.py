@@ -35,6 +35,28 @@ class MicroserviceClient:
             logger.error(f"Error occured while getting events {e}")
     
 
+    def submit_research_job(self, department_code: str):
+        """
+        Queue research extraction on the microservice instead of waiting for it.
+        Returns the job description, including job_id to poll with get_job.
+        """
+        url = f"{self.base_url}/jobs/research/{department_code}"
+        try:
+            response = httpx.post(url, timeout=30)
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPError as e:
+            logger.error(f"Error occurred while submitting research job: {e}")
+
+    def get_job(self, job_id: str):
+        url = f"{self.base_url}/jobs/{job_id}"
+        try:
+            response = httpx.get(url, timeout=30)
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPError as e:
+            logger.error(f"Error occurred while getting job {job_id}: {e}")
+
     def test_connection(self):
         url = f"{self.base_url}/health"
         response = httpx.get(url)
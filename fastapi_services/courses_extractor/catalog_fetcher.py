@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import re
+import time
+
+import httpx
+from bs4 import BeautifulSoup
+from typing import List, Dict, Optional
+
+import sys
+import os
+
+# Add the fastapi_services directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from courses_extractor import config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# showCourse('22', '123456', this, 'a:2:{...}')
+SHOW_COURSE_PATTERN = re.compile(r"showCourse\(\s*'(\d+)'\s*,\s*'(\d+)'\s*,\s*this\s*,\s*'([^']*)'")
+
+
+def find_course_links(html: str) -> List[Dict[str, str]]:
+    """
+    Find the courses listed on an Acalog program page.
+
+    Args:
+        html: Program page html.
+
+    Returns:
+        List of {"name", "catoid", "coid", "display_options"} in page order, without duplicates.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    courses = []
+    seen = set()
+    for link in soup.select('li.acalog-course span a[onclick*="showCourse"]'):
+        match = SHOW_COURSE_PATTERN.search(link.get("onclick", ""))
+        if not match or match.group(2) in seen:
+            continue
+        seen.add(match.group(2))
+        courses.append({
+            "name": link.get_text(" ", strip=True),
+            "catoid": match.group(1),
+            "coid": match.group(2),
+            "display_options": match.group(3),
+        })
+    return courses
+
+
+def course_fragment_to_markdown(name: str, fragment: str) -> str:
+    """
+    Convert a course detail fragment into the same ###...--- block prefilter_markdown produces.
+    """
+    text = BeautifulSoup(fragment, "html.parser").get_text("\n", strip=True)
+    return f"### {name}\n\n{text}\n\n---"
+
+
+async def fetch_course_blocks(program_url: str, stats: Optional[Dict] = None) -> List[str]:
+    """
+    Fetch every course on a program page over plain HTTP, without a browser. The program
+    page is fetched once to discover course ids, then each course's detail fragment is
+    fetched concurrently from the Acalog ajax endpoint.
+
+    Args:
+        program_url: Acalog program page url from config.get_base_urls().
+        stats: Optional dictionary that receives fetch counts and timing.
+
+    Returns:
+        List of course markdown blocks, one per course that was fetched successfully.
+    """
+    http_config = config.get_http_config()
+    semaphore = asyncio.Semaphore(http_config["max_concurrent"])
+    limits = httpx.Limits(max_connections=http_config["max_concurrent"], max_keepalive_connections=http_config["max_concurrent"])
+    start = time.perf_counter()
+
+    async with httpx.AsyncClient(timeout=http_config["timeout_seconds"], limits=limits, follow_redirects=True) as client:
+        response = await client.get(program_url)
+        response.raise_for_status()
+        courses = find_course_links(response.text)
+        logger.info(f"Found {len(courses)} courses on {program_url}")
+
+        async def fetch_single(course: Dict[str, str]) -> Optional[str]:
+            params = {
+                "catoid": course["catoid"],
+                "coid": course["coid"],
+                "display_options": course["display_options"],
+                "show": "",
+            }
+            async with semaphore:
+                try:
+                    fragment = await client.get(http_config["course_url"], params=params)
+                    fragment.raise_for_status()
+                except httpx.HTTPError as e:
+                    logger.error(f"Error fetching course {course['name']}: {e}")
+                    return None
+            return course_fragment_to_markdown(course["name"], fragment.text)
+
+        blocks = await asyncio.gather(*[fetch_single(course) for course in courses])
+
+    course_blocks = [block for block in blocks if block]
+    if stats is not None:
+        stats["courses_found"] = len(courses)
+        stats["courses_fetched"] = len(course_blocks)
+        stats["fetch_seconds"] = round(time.perf_counter() - start, 3)
+    return course_blocks
@@ -1,3 +1,4 @@
+import os
 from typing import List, Dict
 
 def get_base_urls() -> Dict[str, str]:
@@ -33,9 +34,69 @@ def get_llm_prompt() -> List[Dict[str, str]]:
         }
     ]
 
+def get_packed_llm_prompt() -> List[Dict[str, str]]:
+    """
+    Get the LLM prompt template for extracting several courses from one prompt.
+    """
+    return [
+        {
+            "role": "system",
+            "content": """Your role is to extract information from a markdown file.
+                    The markdown contains several courses. Each course starts with a ### heading and ends with ---.
+                    Extract exactly one entry per course, in the order they appear. Each course should have the following fields:
+
+                        course_name: str
+                        course_description: str
+                        course_prereqs: str
+                        course_credits: int
+            """
+        },
+        {
+            "role": "user",
+            "content": "{markdown}"
+        }
+    ]
+
+def get_packing_config() -> Dict:
+    """
+    Get settings for packing several course blocks into one LLM prompt.
+    Packed responses that don't validate fall back to one call per course.
+    """
+    return {
+        "enabled": os.getenv("COURSES_PACKING_ENABLED", "true").lower() in ("1", "true", "yes"),
+        "max_courses_per_prompt": int(os.getenv("COURSES_PACKING_MAX_COURSES", 15)),
+        "max_tokens_per_prompt": int(os.getenv("COURSES_PACKING_MAX_TOKENS", 6000)),
+    }
+
+def get_fetch_engine() -> str:
+    """
+    Get how course pages are fetched: "browser" renders the program page and expands every
+    course in Chromium, "http" fetches each course's detail fragment directly.
+    """
+    return os.getenv("COURSES_FETCH_ENGINE", "browser").lower()
+
+def get_http_config() -> Dict:
+    """
+    Get settings for the "http" fetch engine.
+    """
+    return {
+        "course_url": "https://catalog.wwu.edu/ajax/preview_course.php",
+        "max_concurrent": int(os.getenv("COURSES_HTTP_MAX_CONCURRENT", 10)),
+        "timeout_seconds": float(os.getenv("COURSES_HTTP_TIMEOUT", 20.0)),
+    }
+
+def get_expansion_timeout_ms() -> int:
+    """
+    Maximum time to wait for every course to expand, in milliseconds.
+    """
+    return int(os.getenv("COURSES_EXPANSION_TIMEOUT_MS", 20000))
+
 def get_js_commands() -> List[str]:
     """
-    Get JavaScript commands for expanding all course sections.
+    Get JavaScript commands for expanding all course sections. After clicking every course
+    link the script polls until each li.acalog-course has its expanded details (or the
+    timeout passes), then records the time it took on the body's data-course-expansion-ms
+    attribute and sets window.__coursesExpanded for the wait_for condition.
     """
     return [
         """
@@ -46,8 +107,23 @@ def get_js_commands() -> List[str]:
             }
         }
 
-        expandAllCourses();
-        """
+        function allCoursesExpanded() {
+            const courses = document.querySelectorAll('li.acalog-course');
+            return Array.from(courses).every(course => course.querySelector('.ajaxcourseindentfix'));
+        }
+
+        async function waitForExpansion(timeoutMs) {
+            const start = performance.now();
+            while (!allCoursesExpanded() && performance.now() - start < timeoutMs) {
+                await new Promise(resolve => setTimeout(resolve, 100));
+            }
+            document.body.setAttribute('data-course-expansion-ms', Math.round(performance.now() - start));
+            document.body.setAttribute('data-course-expanded-all', allCoursesExpanded());
+            window.__coursesExpanded = true;
+        }
+
+        expandAllCourses().then(() => waitForExpansion(%d));
+        """ % get_expansion_timeout_ms()
     ]
 
 def get_browser_config(debug_mode: bool = False) -> Dict:
@@ -67,5 +143,16 @@ def get_crawler_config() -> Dict:
     """
     return {
         "js_code": get_js_commands(),
-        "delay_before_return_html": 15.0  # Wait for all expansions to complete
+        # Resolves once every course has expanded or the expansion timeout passed
+        "wait_for": "js:() => window.__coursesExpanded === true",
+        "wait_for_timeout": get_expansion_timeout_ms() + 5000
     }
+
+def get_llm_backends() -> str:
+    """
+    Get the LLM backends used to extract course blocks, as a comma-separated list of
+    provider:model[@base_url] entries (see shared_utils.llm_router.parse_backends).
+    Several backends spread calls across them, e.g. local Ollama replicas plus Gemini.
+    Set with COURSES_LLM_BACKENDS, or LLM_BACKENDS for every extractor.
+    """
+    return os.getenv("COURSES_LLM_BACKENDS") or os.getenv("LLM_BACKENDS") or "google-genai:gemini-2.5-flash-lite"
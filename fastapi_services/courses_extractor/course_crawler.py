@@ -3,11 +3,11 @@ import os
 import logging
 import re
 
-from crawl4ai import AsyncWebCrawler, CrawlerRunConfig, BrowserConfig
+from crawl4ai import CrawlerRunConfig, BrowserConfig
 from dotenv import load_dotenv
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel, Field
-from typing import List, Dict
+from typing import AsyncIterator, List, Dict, Optional
 
 import sys
 import os
@@ -16,9 +16,15 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from shared_utils import csv_writer
-from shared_utils import llm_init
-from shared_utils import llm_ainvoke_batch
+from shared_utils import llm_route, parse_backends, routing_labels
+from shared_utils import llm_ainvoke_batch_courses
+from shared_utils import cache_scope
+from shared_utils import llm_ainvoke_many
+from shared_utils import llm_astream_many
+from shared_utils import pack_blocks
+from shared_utils import browser_session
 from courses_extractor import config
+from courses_extractor.catalog_fetcher import fetch_course_blocks
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -31,6 +37,9 @@ class courseInfo(BaseModel):
     prereqs: str = Field("", description="Prerequisites of the course")
     credits: int = Field(-1, description="Number of credits the course is worth")
 
+class courseList(BaseModel):
+    courses: List[courseInfo] = Field(default_factory=list, description="Courses in the order they appear")
+
 
 async def prefilter_markdown(markdown: str) -> list[str]:
     """
@@ -64,47 +73,171 @@ async def prefilter_markdown(markdown: str) -> list[str]:
         return [markdown]
 
 
-async def crawl_courses(department_code: str, debug_mode: bool) -> List:
+async def extract_courses_packed(markdown_list: List[str], backends: List[Dict], max_concurrent: Optional[int] = None, stats: Optional[Dict] = None) -> List[Dict]:
+    """
+    Extract courses with several course blocks per LLM prompt.
+    Packs whose response doesn't contain exactly one course per block are retried one course per call.
+
+    Args:
+        markdown_list: Course blocks from prefilter_markdown.
+        backends: LLM backends from parse_backends(config.get_llm_backends()).
+        max_concurrent: Optional ceiling on concurrent LLM calls.
+        stats: Optional dictionary that receives LLM call counts.
+
+    Returns:
+        List of extracted course dictionaries.
+    """
+    packing_config = config.get_packing_config()
+    packs = pack_blocks(
+        markdown_list,
+        max_items=packing_config["max_courses_per_prompt"],
+        max_tokens=packing_config["max_tokens_per_prompt"]
+    )
+    logger.info(f"Packed {len(markdown_list)} course blocks into {len(packs)} prompts")
+
+    model, model_provider = routing_labels(backends)
+    packed_prompt = ChatPromptTemplate.from_messages(config.get_packed_llm_prompt())
+    packed_llm = llm_route(packed_prompt, courseList, backends)
+    inputs = [{"markdown": "\n\n".join(markdown_list[i] for i in pack)} for pack in packs]
+    labels = [f"course pack {i}" for i in range(len(packs))]
+    packed_results = await llm_ainvoke_many(
+        packed_llm,
+        inputs,
+        max_concurrent=max_concurrent,
+        cache_scope=cache_scope(packed_prompt, courseList, model),
+        labels=labels,
+        provider=model_provider,
+        stats=stats
+    )
+
+    fallback_blocks = []
+    course_list = []
+    for pack, result in zip(packs, packed_results):
+        if result and len(result["courses"]) == len(pack):
+            course_list.extend(result["courses"])
+        else:
+            fallback_blocks.extend(markdown_list[i] for i in pack)
+
+    if fallback_blocks:
+        logger.warning(f"Packed extraction failed validation for {len(fallback_blocks)} courses. Falling back to per-course calls")
+        prompt_template = ChatPromptTemplate.from_messages(config.get_llm_prompt())
+        llm = llm_route(prompt_template, courseInfo, backends)
+        course_list.extend(await llm_ainvoke_batch_courses(
+            llm,
+            fallback_blocks,
+            max_concurrent=max_concurrent,
+            cache_scope=cache_scope(prompt_template, courseInfo, model),
+            provider=model_provider,
+            stats=stats
+        ))
+    return course_list
+
+def read_expansion_stats(html: str) -> Dict:
+    """
+    Reads how long course expansion took from the attributes set by the expansion script.
+    """
+    stats = {}
+    wait_match = re.search(r'data-course-expansion-ms="(\d+)"', html or "")
+    if wait_match:
+        stats["expansion_wait_seconds"] = int(wait_match.group(1)) / 1000
+    expanded_match = re.search(r'data-course-expanded-all="(true|false)"', html or "")
+    if expanded_match:
+        stats["expanded_all"] = expanded_match.group(1) == "true"
+    return stats
+
+async def render_course_blocks(department_code: str, base_url: str, debug_mode: bool, stats: Optional[Dict] = None) -> List[str]:
+    """
+    Render the program page in a browser, expand every course and split it into course blocks.
+    """
+    crawler_config_dict = config.get_crawler_config()
+    crawler_config = CrawlerRunConfig(**crawler_config_dict)
+    browser_config_dict = config.get_browser_config(debug_mode)
+    b_config = BrowserConfig(**browser_config_dict)
+
+    async with browser_session(b_config) as crawler:
+        results = await crawler.arun(url=base_url, config=crawler_config)
+    expansion_stats = read_expansion_stats(results.html)
+    logger.info(f"Course expansion for {department_code}: {expansion_stats}")
+    if not expansion_stats.get("expanded_all", True):
+        logger.warning(f"Not every {department_code} course expanded before the timeout")
+    if stats is not None:
+        stats.update(expansion_stats)
+    return await prefilter_markdown(results.markdown)
+
+async def get_course_blocks(department_code: str, debug_mode: bool, stats: Optional[Dict] = None) -> List[str]:
+    """
+    Fetch a department's program page with the configured fetch engine and split it into course blocks.
+    """
     # Retrieve url to scrape
     base_urls = config.get_base_urls()
     if department_code not in base_urls:
         raise ValueError(f"{department_code} is not a valid department at WWU.")
     base_url = base_urls[department_code]
 
+    if config.get_fetch_engine() == "http" and not debug_mode:
+        return await fetch_course_blocks(base_url, stats)
+    return await render_course_blocks(department_code, base_url, debug_mode, stats)
+
+async def crawl_courses(department_code: str, debug_mode: bool, stats: Optional[Dict] = None) -> List:
     # Configs
     prompt_template = ChatPromptTemplate.from_messages(config.get_llm_prompt())
-    crawler_config_dict = config.get_crawler_config()
-    crawler_config = CrawlerRunConfig(**crawler_config_dict)
-    browser_config_dict = config.get_browser_config(debug_mode)
-    b_config = BrowserConfig(**browser_config_dict)
-
-    # List of courses to return
-    course_list = []
 
     # Start crawl
-    async with AsyncWebCrawler(config=b_config) as crawler:
-        results = await crawler.arun(url=base_url, config=crawler_config)
-        markdown_list = await prefilter_markdown(results.markdown)
-        if not markdown_list:
-            return []
-        try:
-            llm = llm_init(prompt_template, courseInfo, "gemini-2.5-flash-lite", "google-genai")
-            for i, entry in enumerate(markdown_list):
-                logger.info(f"invoking markdown extraction {i}")
-                course = llm.invoke({"markdown": entry})
-                course_list.append(course.model_dump())
-
-        except Exception as e:
-            logger.error(f"LLM error extracting courses: {e}")
-            return []
-    
+    markdown_list = await get_course_blocks(department_code, debug_mode, stats)
+    if not markdown_list:
+        return []
+
+    # Extract course information from each block
+    try:
+        backends = parse_backends(config.get_llm_backends())
+        model, model_provider = routing_labels(backends)
+        if config.get_packing_config()["enabled"]:
+            course_list = await extract_courses_packed(markdown_list, backends, stats=stats)
+        else:
+            llm = llm_route(prompt_template, courseInfo, backends)
+            course_list = await llm_ainvoke_batch_courses(
+                llm,
+                markdown_list,
+                cache_scope=cache_scope(prompt_template, courseInfo, model),
+                provider=model_provider,
+                stats=stats
+            )
+    except Exception as e:
+        logger.error(f"LLM error extracting courses: {e}")
+        return []
+
     return course_list
 
-async def extract_course(department_code: str, debug_mode: bool=False):
-    course_info = await crawl_courses(department_code, debug_mode)
+async def stream_courses(department_code: str, debug_mode: bool=False) -> AsyncIterator[Dict]:
+    """
+    Streaming version of extract_course. Each course block gets its own LLM call, without
+    packing, so every course is emitted as soon as it is extracted.
+
+    Yields:
+        Course information dictionaries in completion order.
+    """
+    markdown_list = await get_course_blocks(department_code, debug_mode)
+    if not markdown_list:
+        return
+
+    backends = parse_backends(config.get_llm_backends())
+    model, model_provider = routing_labels(backends)
+    prompt_template = ChatPromptTemplate.from_messages(config.get_llm_prompt())
+    llm = llm_route(prompt_template, courseInfo, backends)
+    async for _, course in llm_astream_many(
+        llm,
+        [{"markdown": markdown} for markdown in markdown_list],
+        cache_scope=cache_scope(prompt_template, courseInfo, model),
+        labels=[f"course block {i}" for i in range(len(markdown_list))],
+        provider=model_provider
+    ):
+        if course:
+            yield course
+
+async def extract_course(department_code: str, debug_mode: bool=False, stats: Optional[Dict] = None):
+    course_info = await crawl_courses(department_code, debug_mode, stats)
     if course_info:
         csv_writer(course_info, f"{department_code}_courses.csv")
-    print(type(course_info[0]))
 
     return course_info
 
@@ -1,31 +1,64 @@
-from fastapi import FastAPI, HTTPException, Request, Header
+from fastapi import FastAPI, HTTPException, Request, Header, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 import asyncio
 import logging
 import os
 import json
-from typing import List, Dict, Any, Optional
+import time
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator
 import requests
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from pydantic import BaseModel
 # Add the services directory to Python path to fix import issues
 
 # Import all extractor functions
-from research_extractor import extract_research_by_department
-from events_extractor import extract_events
-from courses_extractor import extract_course
+from research_extractor import extract_research_by_department, stream_research_by_department, extract_faculty_urls
+from events_extractor import extract_events, stream_events
+from courses_extractor import extract_course, stream_courses
 from shared_utils import csv_writer
-from storage import save_to_storage
+from shared_utils import BrowserPool, set_browser_pool, get_browser_pool_config
+from shared_utils import SingleFlight
+from research_delta import publish_research, load_research_changes, load_latest_research
+from jobs import JobManager, get_job_manager_config
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+job_manager = JobManager(**get_job_manager_config())
+# Concurrent identical extraction requests share one crawl
+extraction_flights = SingleFlight()
+# Keeps background refresh tasks referenced until they finish
+background_refreshes = set()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Starts a shared browser pool that extractors borrow from for the lifetime of the app,
+    so each request doesn't pay for launching its own Chromium, and the background job workers.
+    """
+    pool_config = get_browser_pool_config()
+    browser_pool = BrowserPool(size=pool_config["size"], max_uses=pool_config["max_uses"])
+    await browser_pool.start()
+    set_browser_pool(browser_pool)
+    job_manager.start()
+    try:
+        yield
+    finally:
+        await job_manager.stop()
+        set_browser_pool(None)
+        await browser_pool.close()
+
+
 # Create the FastAPI app instance
 app = FastAPI(
     title="WWU Resource Extractor API",
     description="An API to scrape WWU resources from university websites.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -38,6 +71,58 @@ app.add_middleware(
 
 
 
+def set_stats_headers(response: Response, prefix: str, stats: Dict[str, Any]):
+    """
+    Expose extraction stats as response headers, e.g. fast_path -> X-Events-Fast-Path.
+    """
+    for key, value in stats.items():
+        name = "-".join(part.capitalize() for part in key.split("_"))
+        response.headers[f"{prefix}-{name}"] = str(value)
+
+
+async def research_flight(department_code: str) -> List[Dict]:
+    """
+    Extracts research for a department and publishes it as a delta against the stored
+    snapshot. Concurrent callers share one run.
+    """
+    async def run():
+        # The faculty list tells a professor who left apart from one whose page failed
+        faculty_urls = await extract_faculty_urls(department_code)
+        research_data = await extract_research_by_department(department_code, debug_mode=False, write_to_csv=True, faculty_urls=faculty_urls)
+        if research_data:
+            try:
+                await asyncio.to_thread(publish_research, department_code, research_data, faculty_urls)
+            except Exception as e:
+                # The stored version stays as it was; the next run publishes again
+                logger.error(f"Failed to publish research for {department_code}: {e}")
+        return research_data
+    return await extraction_flights.do(f"research:{department_code}", run)
+
+
+async def courses_flight(department_code: str) -> Tuple[List[Dict], Dict[str, Any]]:
+    """
+    Extracts courses for a department. Concurrent callers share one run and its stats.
+    """
+    async def run():
+        stats = {}
+        courses = await extract_course(department_code, debug_mode=False, stats=stats)
+        return courses, stats
+    return await extraction_flights.do(f"courses:{department_code}", run)
+
+
+async def events_flight(debug_mode: bool = False) -> Tuple[List[Dict], Dict[str, Any]]:
+    """
+    Extracts all events. Concurrent callers share one run and its stats.
+    """
+    from events_extractor.config import get_base_url
+
+    async def run():
+        stats = {}
+        events = await extract_events(get_base_url(), debug_mode=debug_mode, stats=stats)
+        return events, stats
+    return await extraction_flights.do(f"events:{debug_mode}", run)
+
+
 @app.get("/")
 async def read_root():
     """
@@ -73,7 +158,7 @@ async def extract_research_endpoint(department_code: str):
     try:
         # Add timeout to prevent hanging
         research_data = await asyncio.wait_for(
-            extract_research_by_department(department_code, debug_mode=False, write_to_csv=True),
+            research_flight(department_code),
             timeout=300  # 5 minutes timeout
         )
 
@@ -83,8 +168,6 @@ async def extract_research_endpoint(department_code: str):
             raise HTTPException(status_code=404, detail=f"No faculty research data found for department code: {department_code}")
 
         logger.info(f"Successfully extracted {len(research_data)} records for {department_code}.")
-
-        save_to_storage(research_data, 'research_scrapes', "professors.json")
         return research_data
 
     except asyncio.TimeoutError:
@@ -100,19 +183,95 @@ async def extract_research_endpoint(department_code: str):
         raise HTTPException(status_code=500, detail="An internal server error occurred during research scraping.")
 
 
+def get_research_snapshot_ttl() -> int:
+    """
+    Age in seconds after which a stored research snapshot is refreshed in the background.
+    """
+    return int(os.getenv("RESEARCH_SNAPSHOT_TTL_SECONDS", 24 * 60 * 60))
+
+
+def refresh_research_in_background(department_code: str):
+    if extraction_flights.in_flight(f"research:{department_code}"):
+        return
+    logger.info(f"Refreshing stale research snapshot for {department_code} in the background")
+    task = asyncio.create_task(research_flight(department_code))
+    background_refreshes.add(task)
+
+    def finished(done: asyncio.Task):
+        background_refreshes.discard(done)
+        if not done.cancelled() and done.exception():
+            logger.error(f"Background research refresh failed for {department_code}: {done.exception()}")
+    task.add_done_callback(finished)
+
+
+@app.get("/research/{department_code}")
+async def get_research_endpoint(department_code: str, response: Response):
+    """
+    Serves the last stored research snapshot for a department without scraping.
+    Snapshots older than RESEARCH_SNAPSHOT_TTL_SECONDS are still served, and refreshed in
+    the background. Only when no snapshot is stored is the department scraped synchronously.
+    The snapshot's age is returned in the Age and X-Snapshot-* headers.
+
+    - **department_code**: The code for the department (e.g., 'CSCI').
+    """
+    from research_extractor.config import get_base_urls
+    if department_code not in get_base_urls():
+        raise HTTPException(status_code=400, detail=f"{department_code} is not a valid department at WWU.")
+
+    snapshot = await asyncio.to_thread(load_latest_research, department_code)
+    if snapshot is None:
+        logger.info(f"No stored research snapshot for {department_code}. Scraping now")
+        response.headers["X-Snapshot-Source"] = "live"
+        return await extract_research_endpoint(department_code)
+
+    research_data, saved_at = snapshot
+    age = max(0, int(time.time() - saved_at))
+    stale = age > get_research_snapshot_ttl()
+    if stale:
+        refresh_research_in_background(department_code)
+
+    response.headers["Age"] = str(age)
+    response.headers["X-Snapshot-Source"] = "storage"
+    response.headers["X-Snapshot-Age-Seconds"] = str(age)
+    response.headers["X-Snapshot-Stale"] = str(stale).lower()
+    return research_data
+
+
+@app.get("/research/{department_code}/changes")
+async def get_research_changes_endpoint(department_code: str, since: int = 0):
+    """
+    Change feed of a department's research: the deltas published after version `since`,
+    oldest first. Each delta lists added and changed professors and removed src_urls.
+    If `complete` is false, older deltas have been pruned and the full snapshot from
+    /research/{department_code} should be reloaded.
+
+    - **department_code**: The code for the department (e.g., 'CSCI').
+    - **since**: Last version the caller has applied.
+    """
+    from research_extractor.config import get_base_urls
+    if department_code not in get_base_urls():
+        raise HTTPException(status_code=400, detail=f"{department_code} is not a valid department at WWU.")
+
+    changes = await asyncio.to_thread(load_research_changes, department_code, since)
+    if changes is None:
+        raise HTTPException(status_code=404, detail=f"No research has been published for {department_code}.")
+    return changes
+
+
 @app.get("/extract/events")
-async def extract_events_endpoint():
+async def extract_events_endpoint(response: Response):
     """
     Extracts all events from the website.
+    Extraction stats are returned in X-Events-* response headers.
     """
     logger.info("Received request to extract events")
     try:
-        from events_extractor.config import get_base_url
         # events = await asyncio.wait_for(
-        #     extract_events(get_base_url(), debug_mode=False),
+        #     events_flight(debug_mode=False),
         #     timeout=600  # 10 minutes timeout (events can take longer)
         # )
-        events = await extract_events(get_base_url(), debug_mode=True)
+        events, stats = await events_flight(debug_mode=True)
+        set_stats_headers(response, "X-Events", stats)
         if not events:
             logger.warning("No events found")
             raise HTTPException(status_code=404, detail="No events found")
@@ -128,14 +287,15 @@ async def extract_events_endpoint():
 
 
 @app.get("/extract/courses/{department_code}")
-async def exract_courses_endpoint(department_code: str):
+async def exract_courses_endpoint(department_code: str, response: Response):
     """
     API endpoint to extract course information for a given department.
+    Crawl stats are returned in X-Courses-* response headers.
     """
     logger.info(f"Received request to extract courses for department: {department_code}")
     try:
-        courses = await extract_course(department_code, debug_mode=False)
-        print(type(courses[0]))
+        courses, stats = await courses_flight(department_code)
+        set_stats_headers(response, "X-Courses", stats)
         if not courses:
             logger.warning("No courses found")
             raise HTTPException(status_code=404, detail="No courses found for the specified department")
@@ -153,17 +313,32 @@ async def exract_courses_endpoint(department_code: str):
         raise HTTPException(status_code=500, detail="An internal server error occurred during course scraping.")
 
 
+def get_extract_all_limits() -> Dict[str, int]:
+    """
+    Concurrency limits for /extract/all. "global" caps the number of jobs running at once;
+    the per-source limits keep browser-heavy (events) and LLM-heavy (research, courses)
+    jobs from saturating one resource.
+    """
+    return {
+        "global": int(os.getenv("EXTRACT_ALL_MAX_CONCURRENT", 4)),
+        "research": int(os.getenv("EXTRACT_ALL_RESEARCH_CONCURRENCY", 2)),
+        "events": int(os.getenv("EXTRACT_ALL_EVENTS_CONCURRENCY", 1)),
+        "courses": int(os.getenv("EXTRACT_ALL_COURSES_CONCURRENCY", 2)),
+    }
+
+
 @app.get("/extract/all")
 async def extract_all():
     """
     Extracts all data from all sources. This is the main endpoint for scheduled crawlers.
 
-    This endpoint will:
-    1. Extract research data for all departments (CSCI, BIO, MATH)
+    This endpoint will concurrently:
+    1. Extract research data for all departments (CSCI, MATH)
     2. Extract all events
-    3. Extract course data for all departments (CSCI, MATH, PSYCH, BUS)
+    3. Extract course data for all departments (CSCI, MATH)
 
-    Returns a summary of what was extracted.
+    Jobs run under the limits from get_extract_all_limits().
+    Returns a summary of what was extracted, with the duration of each job.
     """
     logger.info("Received request to extract all data")
 
@@ -183,72 +358,61 @@ async def extract_all():
     research_departments = ["CSCI", "MATH"]
     course_departments = ["CSCI", "MATH"]
 
-    try:
-        # Extract research data for all departments
-        logger.info("Starting research data extraction...")
-        for dept in research_departments:
+    limits = get_extract_all_limits()
+    global_semaphore = asyncio.Semaphore(limits["global"])
+    source_semaphores = {source: asyncio.Semaphore(limits[source]) for source in ("research", "events", "courses")}
+
+    async def run_job(source: str, dept: Optional[str], job):
+        label = f"{source} ({dept})" if dept else source
+        async with source_semaphores[source], global_semaphore:
+            start = time.perf_counter()
             try:
-                research_data = await extract_research_by_department(dept, debug_mode=False, write_to_csv=True)
-                results["research"][dept] = {
+                data = await job()
+                stats = None
+                # Course and event flights return (data, stats)
+                if isinstance(data, tuple):
+                    data, stats = data
+                job_result = {
                     "status": "success",
-                    "count": len(research_data) if research_data else 0
+                    "count": len(data) if data else 0
                 }
-                results["summary"]["successful"] += 1
-                logger.info(f"Successfully extracted research for {dept}: {len(research_data) if research_data else 0} records")
+                if stats:
+                    job_result["stats"] = stats
+                logger.info(f"Successfully extracted {label}: {job_result['count']} records")
             except Exception as e:
-                results["research"][dept] = {
+                job_result = {
                     "status": "failed",
                     "error": str(e),
                     "count": 0
                 }
-                results["summary"]["failed"] += 1
-                results["summary"]["errors"].append(f"Research extraction failed for {dept}: {str(e)}")
-                logger.error(f"Research extraction failed for {dept}: {e}")
+                logger.error(f"Extraction failed for {label}: {e}")
+            job_result["duration_seconds"] = round(time.perf_counter() - start, 3)
+        return source, dept, job_result
 
-        # Extract events
-        logger.info("Starting events extraction...")
-        try:
-            from events_extractor.config import get_base_url
-            events = await extract_events(get_base_url(), debug_mode=False)
-            results["events"] = {
-                "status": "success",
-                "count": len(events) if events else 0
-            }
-            results["summary"]["successful"] += 1
-            logger.info(f"Successfully extracted events: {len(events) if events else 0} records")
-        except Exception as e:
-            results["events"] = {
-                "status": "failed",
-                "error": str(e),
-                "count": 0
-            }
-            results["summary"]["failed"] += 1
-            results["summary"]["errors"].append(f"Events extraction failed: {str(e)}")
-            logger.error(f"Events extraction failed: {e}")
-
-        # Extract course data for all departments
-        logger.info("Starting course data extraction...")
+    try:
+        start = time.perf_counter()
+        jobs = []
+        for dept in research_departments:
+            jobs.append(run_job("research", dept, lambda dept=dept: research_flight(dept)))
+        jobs.append(run_job("events", None, lambda: events_flight(debug_mode=False)))
         for dept in course_departments:
-            try:
-                courses = await extract_course(dept, debug_mode=False)
-                results["courses"][dept] = {
-                    "status": "success",
-                    "count": len(courses) if courses else 0
-                }
+            jobs.append(run_job("courses", dept, lambda dept=dept: courses_flight(dept)))
+
+        for source, dept, job_result in await asyncio.gather(*jobs):
+            if dept is None:
+                results[source] = job_result
+            else:
+                results[source][dept] = job_result
+
+            if job_result["status"] == "success":
                 results["summary"]["successful"] += 1
-                logger.info(f"Successfully extracted courses for {dept}: {len(courses) if courses else 0} records")
-            except Exception as e:
-                results["courses"][dept] = {
-                    "status": "failed",
-                    "error": str(e),
-                    "count": 0
-                }
+            else:
                 results["summary"]["failed"] += 1
-                results["summary"]["errors"].append(f"Course extraction failed for {dept}: {str(e)}")
-                logger.error(f"Course extraction failed for {dept}: {e}")
+                target = f"{source.title()} extraction failed for {dept}" if dept else f"{source.title()} extraction failed"
+                results["summary"]["errors"].append(f"{target}: {job_result['error']}")
 
-        # Calculate total extractions attempted
-        results["summary"]["total_extractions"] = len(research_departments) + len(events) + len(course_departments)
+        results["summary"]["total_extractions"] = len(jobs)
+        results["summary"]["duration_seconds"] = round(time.perf_counter() - start, 3)
 
         # Determine overall status
         if results["summary"]["failed"] == 0:
@@ -266,4 +430,153 @@ async def extract_all():
         results["summary"]["overall_status"] = "critical_failure"
         results["summary"]["errors"].append(f"Critical error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Critical error during extraction: {str(e)}")
-    
+
+
+def job_response(job: Dict[str, Any], created: bool) -> Dict[str, Any]:
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "deduplicated": not created,
+        "status_url": f"/jobs/{job['id']}"
+    }
+
+
+@app.post("/jobs/research/{department_code}", status_code=202)
+async def submit_research_job(department_code: str):
+    """
+    Queues research extraction for a department. Poll /jobs/{job_id} for the result.
+    Submitting while an identical job is queued or running returns that job.
+    """
+    from research_extractor.config import get_base_urls
+    if department_code not in get_base_urls():
+        raise HTTPException(status_code=400, detail=f"{department_code} is not a valid department at WWU.")
+
+    async def run(progress: Dict[str, Any]):
+        progress["stage"] = "extracting"
+        research_data = await research_flight(department_code)
+        progress["count"] = len(research_data)
+        progress["stage"] = "done"
+        return research_data
+
+    job, created = job_manager.submit("research", f"research:{department_code}", {"department_code": department_code}, run)
+    return job_response(job, created)
+
+
+@app.post("/jobs/courses/{department_code}", status_code=202)
+async def submit_courses_job(department_code: str):
+    """
+    Queues course extraction for a department. Poll /jobs/{job_id} for the result.
+    """
+    from courses_extractor.config import get_base_urls
+    if department_code not in get_base_urls():
+        raise HTTPException(status_code=400, detail=f"{department_code} is not a valid department at WWU.")
+
+    async def run(progress: Dict[str, Any]):
+        courses, stats = await courses_flight(department_code)
+        progress.update(stats)
+        return courses
+
+    job, created = job_manager.submit("courses", f"courses:{department_code}", {"department_code": department_code}, run)
+    return job_response(job, created)
+
+
+@app.post("/jobs/events", status_code=202)
+async def submit_events_job():
+    """
+    Queues events extraction. Poll /jobs/{job_id} for the result.
+    """
+    async def run(progress: Dict[str, Any]):
+        events, stats = await events_flight(debug_mode=False)
+        progress.update(stats)
+        return events
+
+    job, created = job_manager.submit("events", "events", {}, run)
+    return job_response(job, created)
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Returns a job's status, progress and, once it has finished, its result or error.
+    """
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"No job found with id: {job_id}")
+    return job
+
+
+@app.get("/jobs")
+async def list_jobs():
+    """
+    Lists known jobs without their results.
+    """
+    return [{key: value for key, value in job.items() if key != "result"} for job in job_manager.list()]
+
+
+def stream_records(records: AsyncIterator[Dict], format: str, label: str) -> StreamingResponse:
+    """
+    Streams records as NDJSON (one JSON object per line) or as Server-Sent Events.
+    An error part-way through is sent as a final {"error": ...} record / "error" event.
+    """
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'sse'")
+
+    async def body():
+        count = 0
+        try:
+            async for record in records:
+                count += 1
+                if format == "sse":
+                    yield f"data: {json.dumps(record)}\n\n"
+                else:
+                    yield json.dumps(record) + "\n"
+        except Exception as e:
+            logger.error(f"Error while streaming {label}: {e}", exc_info=True)
+            error = json.dumps({"error": f"An internal server error occurred during {label} scraping."})
+            yield f"event: error\ndata: {error}\n\n" if format == "sse" else error + "\n"
+            return
+        logger.info(f"Streamed {count} {label} records")
+        if format == "sse":
+            yield f"event: end\ndata: {json.dumps({'count': count})}\n\n"
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(body(), media_type=media_type)
+
+
+@app.get("/stream/research/{department_code}")
+async def stream_research_endpoint(department_code: str, format: str = "ndjson"):
+    """
+    Streams each professor's research information as soon as it is extracted.
+
+    - **department_code**: The code for the department (e.g., 'CSCI').
+    - **format**: 'ndjson' or 'sse'.
+    """
+    from research_extractor.config import get_base_urls
+    if department_code not in get_base_urls():
+        raise HTTPException(status_code=400, detail=f"{department_code} is not a valid department at WWU.")
+    return stream_records(stream_research_by_department(department_code, debug_mode=False), format, "research")
+
+
+@app.get("/stream/courses/{department_code}")
+async def stream_courses_endpoint(department_code: str, format: str = "ndjson"):
+    """
+    Streams each course as soon as it is extracted.
+
+    - **department_code**: The code for the department (e.g., 'CSCI').
+    - **format**: 'ndjson' or 'sse'.
+    """
+    from courses_extractor.config import get_base_urls
+    if department_code not in get_base_urls():
+        raise HTTPException(status_code=400, detail=f"{department_code} is not a valid department at WWU.")
+    return stream_records(stream_courses(department_code, debug_mode=False), format, "course")
+
+
+@app.get("/stream/events")
+async def stream_events_endpoint(format: str = "ndjson"):
+    """
+    Streams each event as soon as it is extracted.
+
+    - **format**: 'ndjson' or 'sse'.
+    """
+    from events_extractor.config import get_base_url
+    return stream_records(stream_events(get_base_url(), debug_mode=False), format, "event")
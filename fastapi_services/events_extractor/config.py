@@ -1,3 +1,4 @@
+import os
 from typing import List, Dict
 
 
@@ -28,15 +29,99 @@ def get_llm_prompt() -> List[Dict[str, str]]:
         }
     ]
 
+def get_packed_llm_prompt() -> List[Dict[str, str]]:
+    """
+    Get the LLM prompt template for extracting several event cards from one prompt.
+    """
+    return [
+        {
+            "role": "system",
+            "content": """Your role is to extract information from a html file.
+                    The html contains several event cards separated by <!-- card --> comments.
+                    Extract exactly one event per card, in the order they appear. Each event should have the following fields:
+
+                        event_name: str
+                        date: str
+                        page_url: str
+            """
+        },
+        {
+            "role": "user",
+            "content": "{html}"
+        }
+    ]
+
+def get_packing_config() -> Dict:
+    """
+    Get settings for packing several event cards into one LLM prompt.
+    Packed responses that don't validate fall back to one call per card.
+    """
+    return {
+        "enabled": os.getenv("EVENTS_PACKING_ENABLED", "false").lower() in ("1", "true", "yes"),
+        "max_cards_per_prompt": int(os.getenv("EVENTS_PACKING_MAX_CARDS", 20)),
+        "max_tokens_per_prompt": int(os.getenv("EVENTS_PACKING_MAX_TOKENS", 8000)),
+    }
+
+def get_event_card_selectors() -> Dict:
+    """
+    CSS selectors for extracting events directly from event cards without the LLM.
+    Each field lists selectors tried in order. Cards whose title or date can't be found,
+    or whose date doesn't match date_pattern, are sent to the LLM instead.
+    """
+    return {
+        "enabled": os.getenv("EVENTS_FAST_PATH_ENABLED", "true").lower() in ("1", "true", "yes"),
+        "title": ["h3", "h2"],
+        "date": ["div:has(> svg title:-soup-contains('Date'))", "time", "div:has(> svg)"],
+        "date_pattern": r"\b(Mon|Tue|Wed|Thu|Fri|Sat|Sun|Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\b.*\d",
+    }
+
+def get_incremental_config() -> Dict:
+    """
+    Get settings for incremental event extraction. Cards are keyed by their href; unchanged
+    cards reuse the previously extracted event. With stop_on_known_page, "Load More" stops
+    once a click loads only known events, and known events seen within max_age_days that
+    weren't loaded are carried over.
+    """
+    return {
+        "enabled": os.getenv("EVENTS_INCREMENTAL_ENABLED", "true").lower() in ("1", "true", "yes"),
+        "stop_on_known_page": os.getenv("EVENTS_STOP_ON_KNOWN_PAGE", "false").lower() in ("1", "true", "yes"),
+        "max_age_days": int(os.getenv("EVENTS_KNOWN_MAX_AGE_DAYS", 7)),
+    }
+
 def get_js_commands() -> List[str]:
     """
     Get JavaScript commands for scrolling and loading more events.
     """
     return [
+        "window.__eventCardCount = document.querySelectorAll('a:has(div.MuiCard-root)').length;",
         "window.scrollTo(0, document.body.scrollHeight);",
         "Array.from(document.querySelectorAll('button')).find(btn => btn.textContent.includes('Load More'))?.click();"
     ]
 
+def get_wait_condition() -> str:
+    """
+    Get the crawl4ai wait_for condition that resolves as soon as "Load More" has appended
+    new cards, or the button is gone because every event is loaded.
+    """
+    return """js:() => {
+        const count = document.querySelectorAll('a:has(div.MuiCard-root)').length;
+        const loadMore = Array.from(document.querySelectorAll('button')).find(btn => btn.textContent.includes('Load More'));
+        return count > (window.__eventCardCount || 0) || !loadMore;
+    }"""
+
+def get_scroll_config() -> Dict:
+    """
+    Get settings for loading more events. The wait for new cards starts at
+    initial_wait_seconds and doubles after every load that adds nothing, up to
+    max_wait_seconds; a load that still adds nothing at that wait ends the scroll.
+    max_iterations is a hard cap on "Load More" clicks.
+    """
+    return {
+        "initial_wait_seconds": float(os.getenv("EVENTS_SCROLL_INITIAL_WAIT", 2.0)),
+        "max_wait_seconds": float(os.getenv("EVENTS_SCROLL_MAX_WAIT", 16.0)),
+        "max_iterations": int(os.getenv("EVENTS_SCROLL_MAX_ITERATIONS", 100)),
+    }
+
 def get_browser_config(debug_mode: bool = False) -> Dict:
     """
     Get browser configuration for the events crawler.
@@ -54,6 +139,16 @@ def get_crawler_config() -> Dict:
     """
     return {
         "js_code": get_js_commands(),
+        "wait_for": get_wait_condition(),
         "js_only": True,  # ensures browser window doesn't reload
         "session_id": "base_event_page_session"  # ensures same tab
     }
+
+def get_llm_backends() -> str:
+    """
+    Get the LLM backends used to extract event cards, as a comma-separated list of
+    provider:model[@base_url] entries (see shared_utils.llm_router.parse_backends).
+    Several backends spread calls across them, e.g. local Ollama replicas plus Gemini.
+    Set with EVENTS_LLM_BACKENDS, or LLM_BACKENDS for every extractor.
+    """
+    return os.getenv("EVENTS_LLM_BACKENDS") or os.getenv("LLM_BACKENDS") or "google-genai:gemini-2.5-flash-lite"
@@ -3,13 +3,14 @@ import os
 import logging
 import csv
 import re
-from bs4 import BeautifulSoup
+import time
+from bs4 import BeautifulSoup, Tag
 
-from crawl4ai import AsyncWebCrawler, CrawlerRunConfig, BrowserConfig
+from crawl4ai import CrawlerRunConfig, BrowserConfig
 from dotenv import load_dotenv
 from langchain_core.prompts import ChatPromptTemplate
-from pydantic import BaseModel, Field
-from typing import List, Dict
+from pydantic import BaseModel, Field, ValidationError
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 from urllib.parse import urljoin, urlparse
 
 import sys
@@ -18,7 +19,13 @@ import os
 # Add the fastapi_services directory to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from shared_utils import csv_writer
-from shared_utils import llm_init
+from shared_utils import llm_route, parse_backends, routing_labels
+from shared_utils import browser_session
+from shared_utils import cache_scope
+from shared_utils import llm_ainvoke_many
+from shared_utils import pack_blocks
+from shared_utils import get_record_store, content_hash, RecordStore
+from shared_utils import llm_astream_many
 from events_extractor import config
 
 
@@ -32,6 +39,9 @@ class EventEntry(BaseModel):
     date: str = Field(..., description="Date the event is planned for")
     page_url: str = Field(..., description="url of the event page")
 
+class eventList(BaseModel):
+    events: List[EventEntry] = Field(default_factory=list, description="Events in the order their cards appear")
+
 def prefilter_html(html: str) -> list[str]:
     """
     Extract only event-related content from the HTML to reduce size for LLM processing.
@@ -54,66 +64,334 @@ def prefilter_html(html: str) -> list[str]:
         logger.error(f"Error pre-filtering HTML: {e}")
         return [html]
 
+def _select_text(card, selectors: List[str]) -> str:
+    for selector in selectors:
+        try:
+            element = card.select_one(selector)
+        except Exception:
+            continue
+        if element and element.get_text(strip=True):
+            return element.get_text(" ", strip=True)
+    return ""
+
+def parse_event_card(card) -> Optional[Dict]:
+    """
+    Extract an event from a card with the CSS selectors in config.get_event_card_selectors().
+
+    Args:
+        card: An event card <a> element from prefilter_html.
+
+    Returns:
+        Event dictionary, or None if the card doesn't validate and needs the LLM.
+    """
+    if not isinstance(card, Tag):
+        return None
+    selectors = config.get_event_card_selectors()
+    href = card.get("href")
+    title = _select_text(card, selectors["title"])
+    date = _select_text(card, selectors["date"])
+    if not href or not title or not re.search(selectors["date_pattern"], date):
+        return None
+    try:
+        return EventEntry(event_name=title, date=date, page_url=href).model_dump()
+    except ValidationError:
+        return None
+
 async def save_html(html: str, filename: str):
     with open(filename, "w") as f:
         f.write(html)
 
-async def crawl_events(base_url: str, debug_mode: bool = False) -> List[EventEntry]:
-    prev_page_len = 0
-    cur_page_len = 0
+def event_card_key(card) -> Optional[str]:
+    """
+    Stable key for an event card: the href of its <a> element.
+    """
+    if not isinstance(card, Tag):
+        return None
+    return card.get("href") or None
+
+async def split_event_cards(cards: List, store: Optional[RecordStore], stats: Optional[Dict] = None) -> Tuple[List[Dict], List[Tuple], List[Tuple], List[str]]:
+    """
+    Resolves every card that doesn't need the LLM: unchanged cards from the record store,
+    then cards the CSS selectors can parse. Stored cards are looked up in one batch off
+    the event loop.
 
+    Returns:
+        Events resolved so far, (key, content hash, event) for newly extracted events,
+        (key, content hash, html) for cards that need the LLM, and keys of unchanged cards.
+    """
+    events_list = []
+    new_records = []
+    llm_cards = []
+    known_keys = []
+    fast_path_enabled = config.get_event_card_selectors()["enabled"]
+    keys = [event_card_key(card) for card in cards]
+    stored_cards = await asyncio.to_thread(store.get_many, [key for key in keys if key]) if store else {}
+    for card, key in zip(cards, keys):
+        card_html = str(card)
+        card_hash = content_hash(card_html)
+        if key:
+            stored = stored_cards.get(key)
+            if stored and stored["content_hash"] == card_hash:
+                events_list.append(stored["value"])
+                known_keys.append(key)
+                continue
+        event = parse_event_card(card) if fast_path_enabled else None
+        if event:
+            events_list.append(event)
+            new_records.append((key, card_hash, event))
+        else:
+            llm_cards.append((key, card_hash, card_html))
+    logger.info(f"{len(known_keys)} event cards unchanged, {len(new_records)} parsed with selectors, {len(llm_cards)} need the LLM")
+    if stats is not None:
+        stats["known"] = len(known_keys)
+        stats["fast_path"] = len(new_records)
+        stats["llm_fallback"] = len(llm_cards)
+    return events_list, new_records, llm_cards, known_keys
+
+async def save_event_records(store: Optional[RecordStore], new_records: List[Tuple], known_keys: List[str]):
+    """
+    Stores newly extracted events and marks unchanged ones as seen, in one transaction
+    each, off the event loop.
+    """
+    if not store:
+        return
+    records = [(key, event, card_hash) for key, card_hash, event in new_records if key]
+    await asyncio.to_thread(store.put_many, records)
+    await asyncio.to_thread(store.touch, known_keys)
+
+async def extract_event_cards(cards: List, max_concurrent: Optional[int] = None, stats: Optional[Dict] = None) -> List[Dict]:
+    """
+    Extract events from event cards. With incremental extraction enabled, cards whose html
+    is unchanged since they were last extracted reuse the stored event. The remaining cards
+    are first parsed with CSS selectors; only cards that fail validation go to the LLM,
+    concurrently. A card that fails extraction is skipped without affecting the others.
+    When packing is enabled, several cards are sent per prompt and packs that fail
+    validation are retried one card per call.
+
+    Args:
+        cards: Event cards from prefilter_html.
+        max_concurrent: Optional ceiling on concurrent LLM calls.
+        stats: Optional dictionary that receives known, fast_path and llm_fallback counts,
+            and LLM call counts.
+
+    Returns:
+        List of extracted event dictionaries with absolute page urls.
+    """
+    backends = parse_backends(config.get_llm_backends())
+    model, model_provider = routing_labels(backends)
+    prompt_template = ChatPromptTemplate.from_messages(config.get_llm_prompt())
+    packing_config = config.get_packing_config()
+    store = get_record_store("events") if config.get_incremental_config()["enabled"] else None
+
+    events_list, new_records, llm_cards, known_keys = await split_event_cards(cards, store, stats)
+
+    single_cards = llm_cards
+    if llm_cards and packing_config["enabled"]:
+        packs = pack_blocks(
+            [card_html for _, _, card_html in llm_cards],
+            max_items=packing_config["max_cards_per_prompt"],
+            max_tokens=packing_config["max_tokens_per_prompt"]
+        )
+        logger.info(f"Packed {len(llm_cards)} event cards into {len(packs)} prompts")
+        packed_prompt = ChatPromptTemplate.from_messages(config.get_packed_llm_prompt())
+        packed_chain = llm_route(packed_prompt, eventList, backends)
+        packed_results = await llm_ainvoke_many(
+            packed_chain,
+            [{"html": "\n<!-- card -->\n".join(llm_cards[i][2] for i in pack)} for pack in packs],
+            max_concurrent=max_concurrent,
+            cache_scope=cache_scope(packed_prompt, eventList, model),
+            labels=[f"event pack {i}" for i in range(len(packs))],
+            provider=model_provider,
+            stats=stats
+        )
+        single_cards = []
+        for pack, result in zip(packs, packed_results):
+            if result and len(result["events"]) == len(pack):
+                for i, event in zip(pack, result["events"]):
+                    events_list.append(event)
+                    new_records.append((llm_cards[i][0], llm_cards[i][1], event))
+            else:
+                single_cards.extend(llm_cards[i] for i in pack)
+        if single_cards:
+            logger.warning(f"Packed extraction failed validation for {len(single_cards)} cards. Falling back to per-card calls")
+
+    if single_cards:
+        extraction_chain = llm_route(prompt_template, EventEntry, backends)
+        results = await llm_ainvoke_many(
+            extraction_chain,
+            [{"html": card_html} for _, _, card_html in single_cards],
+            max_concurrent=max_concurrent,
+            cache_scope=cache_scope(prompt_template, EventEntry, model),
+            labels=[f"event card {i}" for i in range(len(single_cards))],
+            provider=model_provider,
+            stats=stats
+        )
+        failed = sum(1 for result in results if not result)
+        if failed:
+            logger.warning(f"{failed} of {len(results)} event extractions failed")
+        for (key, card_hash, _), event in zip(single_cards, results):
+            if event:
+                events_list.append(event)
+                new_records.append((key, card_hash, event))
+
+    for event in events_list:
+        event["page_url"] = urljoin(config.get_base_url(), event["page_url"])
+
+    await save_event_records(store, new_records, known_keys)
+    return events_list
+
+async def _all_known(cards: List, store) -> bool:
+    keys = [event_card_key(card) for card in cards]
+    if not keys or not all(keys):
+        return False
+    return len(await asyncio.to_thread(store.stored_keys, keys)) == len(set(keys))
+
+async def load_all_events(crawler, base_url: str, session_id: str, crawler_config: CrawlerRunConfig, stats: Optional[Dict] = None) -> Tuple[str, bool]:
+    """
+    Clicks "Load More" until every event is on the page. Each click waits only until
+    new cards appear; when a click adds nothing the wait backs off, and the scroll ends
+    once the button is gone, the backoff is exhausted, or max_iterations is reached.
+    With stop_on_known_page enabled it also ends once a click loads only known events.
+
+    Returns:
+        The html of the loaded page, and whether loading stopped early on known events.
+    """
+    scroll_config = config.get_scroll_config()
+    incremental_config = config.get_incremental_config()
+    store = get_record_store("events") if incremental_config["enabled"] and incremental_config["stop_on_known_page"] else None
+    wait_seconds = scroll_config["initial_wait_seconds"]
+    start = time.perf_counter()
+    stopped_on_known = False
+
+    results = await crawler.arun(url=base_url, config=CrawlerRunConfig(session_id=session_id))
+    html = results.html
+    card_count = len(prefilter_html(html))
+    iterations = 0
+
+    while iterations < scroll_config["max_iterations"]:
+        iterations += 1
+        # execute JS without reloading the page
+        results = await crawler.arun(url=base_url, config=crawler_config.clone(wait_for_timeout=int(wait_seconds * 1000)))
+        if results.success and results.html:
+            html = results.html
+        cards = prefilter_html(html)
+        new_count = len(cards)
+        logger.info(f"Loaded {new_count} event cards after {iterations} iterations")
+
+        if "Load More" not in html:
+            break
+        if new_count > card_count:
+            if store and await _all_known(cards[card_count:], store):
+                logger.info("Loaded a page of only known events. Stopping early")
+                stopped_on_known = True
+                break
+            card_count = new_count
+            wait_seconds = scroll_config["initial_wait_seconds"]
+        elif wait_seconds >= scroll_config["max_wait_seconds"]:
+            break
+        else:
+            wait_seconds = min(wait_seconds * 2, scroll_config["max_wait_seconds"])
+    else:
+        logger.warning(f"Stopped loading events after the {scroll_config['max_iterations']} iteration cap")
+
+    if stats is not None:
+        stats["scroll_iterations"] = iterations
+        stats["scroll_seconds"] = round(time.perf_counter() - start, 3)
+    return html, stopped_on_known
+
+async def fetch_event_cards(base_url: str, debug_mode: bool = False, stats: Optional[Dict] = None) -> Tuple[List, bool]:
+    """
+    Load every event on the listing page and return its cards.
+
+    Returns:
+        Event cards from prefilter_html, and whether loading stopped early on known events.
+    """
     browser_config_dict = config.get_browser_config(debug_mode)
     b_config = BrowserConfig(**browser_config_dict)
 
-    async with AsyncWebCrawler(config=b_config) as crawler:
+    async with browser_session(b_config) as crawler:
         # create a persistent session
         crawler_config_dict = config.get_crawler_config()
         crawler_config = CrawlerRunConfig(**crawler_config_dict)
+        session_id = crawler_config_dict["session_id"]
+        try:
+            html, stopped_on_known = await load_all_events(crawler, base_url, session_id, crawler_config, stats)
+        finally:
+            # the crawler may be a pooled one, so release the tab for the next borrower
+            await crawler.crawler_strategy.kill_session(session_id)
 
-        # navigate once to the base URL
-        await crawler.arun(url=base_url, config=CrawlerRunConfig(session_id=crawler_config_dict["session_id"]))
+    return prefilter_html(html), stopped_on_known
 
-        while True:
-            # execute JS without reloading the page
-            results = await crawler.arun(url=base_url, config=crawler_config)
-            await asyncio.sleep(5)
-            cur_page_len = len(results.html)
-            # debugging check
-            print("Page length:", cur_page_len)
+def carried_over_events(loaded_cards: List) -> List[Dict]:
+    """
+    Events past the last loaded page weren't rendered when loading stopped early on known
+    events; returns the stored ones seen recently.
+    """
+    max_age = config.get_incremental_config()["max_age_days"] * 24 * 60 * 60
+    loaded_keys = {event_card_key(card) for card in loaded_cards}
+    carried_over = get_record_store("events").seen_since(time.time() - max_age)
+    return [event for key, event in carried_over.items() if key not in loaded_keys]
 
-            if cur_page_len == prev_page_len:
-                break
-            else:
-                prev_page_len = cur_page_len
+async def crawl_events(base_url: str, debug_mode: bool = False, stats: Optional[Dict] = None) -> List[EventEntry]:
+    filtered_html_list, stopped_on_known = await fetch_event_cards(base_url, debug_mode, stats)
 
-        results = await crawler.arun(url=base_url, config=crawler_config)
-        filtered_html_list = prefilter_html(results.html)
-        
-        events_list = []
-        try:
-            prompt_template = ChatPromptTemplate.from_messages(config.get_llm_prompt())
-            extraction_chain = llm_init(prompt_template, EventEntry, "gemini-2.5-flash-lite", "google-genai")
-            for html in filtered_html_list:
-                # debugging check
-                logger.info("Extracting event information")
-                output = extraction_chain.invoke({"html": html})
-                event = output.model_dump()
-                event["page_url"] = urljoin(config.get_base_url(), event["page_url"])
-                events_list.append(event)
+    # The browser goes back to the pool before the LLM stage starts
+    try:
+        events_list = await extract_event_cards(filtered_html_list, stats=stats)
+    except Exception as e:
+        logger.error(f"Error extracting events: {e}")
+        return []
+
+    if stopped_on_known:
+        events_list.extend(await asyncio.to_thread(carried_over_events, filtered_html_list))
 
-        except Exception as e:
-            logger.error(f"Error extracting events: {e}")
-            return []
+    if not events_list:
+        logger.warning("Did not find any events")
+        return []
+
+    return events_list
+
+async def stream_events(base_url: str, debug_mode: bool = False) -> AsyncIterator[Dict]:
+    """
+    Streaming version of extract_events. Unchanged and selector-parsed events are emitted
+    first; each remaining card gets its own LLM call, without packing, and is emitted as
+    soon as it is extracted.
 
-        if not events_list:
-            logger.warning("Did not find any events")
-            return []
+    Yields:
+        Event dictionaries with absolute page urls.
+    """
+    cards, stopped_on_known = await fetch_event_cards(base_url, debug_mode)
+    store = get_record_store("events") if config.get_incremental_config()["enabled"] else None
+    events_list, new_records, llm_cards, known_keys = await split_event_cards(cards, store)
+    for event in events_list:
+        event["page_url"] = urljoin(config.get_base_url(), event["page_url"])
+        yield event
+    if stopped_on_known:
+        for event in await asyncio.to_thread(carried_over_events, cards):
+            yield event
 
-        return events_list
+    backends = parse_backends(config.get_llm_backends())
+    model, model_provider = routing_labels(backends)
+    prompt_template = ChatPromptTemplate.from_messages(config.get_llm_prompt())
+    extraction_chain = llm_route(prompt_template, EventEntry, backends)
+    try:
+        async for i, event in llm_astream_many(
+            extraction_chain,
+            [{"html": card_html} for _, _, card_html in llm_cards],
+            cache_scope=cache_scope(prompt_template, EventEntry, model),
+            labels=[f"event card {i}" for i in range(len(llm_cards))],
+            provider=model_provider
+        ):
+            if event:
+                event["page_url"] = urljoin(config.get_base_url(), event["page_url"])
+                new_records.append((llm_cards[i][0], llm_cards[i][1], event))
+                yield event
+    finally:
+        await save_event_records(store, new_records, known_keys)
 
 
-async def extract_events(base_url: str, debug_mode: bool = False):
-    events_list = await crawl_events(base_url, debug_mode)
+async def extract_events(base_url: str, debug_mode: bool = False, stats: Optional[Dict] = None):
+    events_list = await crawl_events(base_url, debug_mode, stats)
     if events_list:
         csv_writer(events_list, "events.csv")
     return events_list
@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_FINISHED_JOBS = 200
+
+# A job receives a progress dictionary it may update while it runs
+JobFunction = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class JobManager:
+    """
+    In-process queue for long-running extractions. Jobs are run by a fixed number of
+    workers; submitting a job whose key matches a queued or running job returns that job
+    instead of starting another. Finished jobs are kept for polling until
+    max_finished_jobs newer jobs have finished.
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, max_finished_jobs: int = DEFAULT_MAX_FINISHED_JOBS):
+        self.workers = workers
+        self.max_finished_jobs = max_finished_jobs
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._functions: Dict[str, JobFunction] = {}
+        self._in_flight: Dict[str, str] = {}
+        self._finished: List[str] = []
+        self._worker_tasks: List[asyncio.Task] = []
+
+    def start(self):
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"Job manager started with {self.workers} workers")
+
+    async def stop(self):
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+    def submit(self, kind: str, key: str, params: Dict[str, Any], function: JobFunction) -> Tuple[Dict[str, Any], bool]:
+        """
+        Enqueue a job, or return the identical job that is already queued or running.
+
+        Args:
+            kind: Type of extraction, e.g. "research".
+            key: Deduplication key; jobs with the same key share one run.
+            params: Parameters reported back with the job.
+            function: Coroutine function that runs the job.
+
+        Returns:
+            The job record, and whether it was newly created.
+        """
+        if key in self._in_flight:
+            return self._jobs[self._in_flight[key]], False
+
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "kind": kind,
+            "params": params,
+            "status": "queued",
+            "progress": {},
+            "result": None,
+            "error": None,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        self._jobs[job_id] = job
+        self._functions[job_id] = function
+        self._in_flight[key] = job_id
+        self._queue.put_nowait((job_id, key))
+        logger.info(f"Queued {kind} job {job_id}")
+        return job, True
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._jobs.get(job_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        return list(self._jobs.values())
+
+    async def _worker(self):
+        while True:
+            job_id, key = await self._queue.get()
+            job = self._jobs[job_id]
+            function = self._functions.pop(job_id)
+            job["status"] = "running"
+            job["started_at"] = time.time()
+            try:
+                job["result"] = await function(job["progress"])
+                job["status"] = "succeeded"
+            except asyncio.CancelledError:
+                job["status"] = "cancelled"
+                raise
+            except Exception as e:
+                logger.error(f"{job['kind']} job {job_id} failed: {e}", exc_info=True)
+                job["status"] = "failed"
+                job["error"] = str(e)
+            finally:
+                job["finished_at"] = time.time()
+                self._in_flight.pop(key, None)
+                self._finished.append(job_id)
+                self._prune()
+                self._queue.task_done()
+
+    def _prune(self):
+        while len(self._finished) > self.max_finished_jobs:
+            self._jobs.pop(self._finished.pop(0), None)
+
+
+def get_job_manager_config() -> Dict[str, int]:
+    """
+    Get job manager settings from JOB_WORKERS and JOB_MAX_FINISHED.
+    """
+    return {
+        "workers": int(os.getenv("JOB_WORKERS", DEFAULT_WORKERS)),
+        "max_finished_jobs": int(os.getenv("JOB_MAX_FINISHED", DEFAULT_MAX_FINISHED_JOBS)),
+    }
@@ -0,0 +1,210 @@
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from storage import (
+    save_to_storage,
+    load_from_storage,
+    delete_from_storage,
+    snapshot_path,
+    delta_path,
+    manifest_path,
+    latest_path,
+)
+
+logger = logging.getLogger(__name__)
+
+RESEARCH_BUCKET = 'research_scrapes'
+RESEARCH_SOURCE = 'research'
+DEFAULT_MAX_MANIFEST_ENTRIES = 50
+
+
+def _normalize(record: Dict[str, Any]) -> Dict[str, Any]:
+    # The LLM doesn't keep research interests in a stable order
+    return {key: sorted(value) if isinstance(value, list) else value for key, value in record.items()}
+
+
+def carry_over_failed(previous: List[Dict[str, Any]], current: List[Dict[str, Any]], faculty_urls: List[str]) -> List[Dict[str, Any]]:
+    """
+    Keep the previous record of professors who are still on the faculty list but whose
+    page failed to crawl or extract this run, so a flaky page doesn't drop them.
+
+    Returns:
+        current plus the carried-over previous records.
+    """
+    listed = set(faculty_urls)
+    current_urls = {record.get("src_url") for record in current}
+    carried = [
+        record for record in previous
+        if record.get("src_url") in listed and record["src_url"] not in current_urls
+    ]
+    if carried:
+        logger.info(f"Carried over {len(carried)} professors whose pages failed this run")
+    return current + carried
+
+
+def diff_research(previous: List[Dict[str, Any]], current: List[Dict[str, Any]], faculty_urls: List[str]) -> Dict[str, List]:
+    """
+    Compare two research snapshots by src_url.
+
+    Args:
+        previous: Professors from the last stored snapshot.
+        current: Professors from this run.
+        faculty_urls: Professor page urls on the faculty list this run. Only professors
+            no longer listed count as removed, not ones whose page failed.
+
+    Returns:
+        {"added": [...], "removed": [src_url, ...], "changed": [...]} where added and
+        changed hold the full new records.
+    """
+    previous_by_url = {record["src_url"]: record for record in previous if record.get("src_url")}
+    current_by_url = {record["src_url"]: record for record in current if record.get("src_url")}
+    listed = set(faculty_urls)
+
+    added = [record for url, record in current_by_url.items() if url not in previous_by_url]
+    removed = [url for url in previous_by_url if url not in current_by_url and url not in listed]
+    changed = [
+        record for url, record in current_by_url.items()
+        if url in previous_by_url and _normalize(record) != _normalize(previous_by_url[url])
+    ]
+    return {"added": added, "removed": removed, "changed": changed}
+
+
+def _load(file_path: str) -> Optional[Any]:
+    stored = load_from_storage(RESEARCH_BUCKET, file_path)
+    return stored[0] if stored else None
+
+
+def publish_research(department_code: str, research_data: List[Dict[str, Any]], faculty_urls: List[str]) -> Dict[str, Any]:
+    """
+    Store a department's research as a new snapshot version when it changed.
+
+    Files live under research/{dept}/: each changed run writes a gzipped snapshot and a
+    gzipped delta (added/changed records, removed src_urls) into that day's folder, then
+    indexes both in manifest.json. The snapshot is what GET /research serves in one
+    read; consumers that only need changes read the deltas. latest.json points at the
+    current snapshot and is written last: save_to_storage raises if an upload fails, so
+    the manifest and latest.json are never pointed at a version whose files aren't
+    stored, and nothing is trimmed. A run that found no changes only updates checked_at
+    in latest.json.
+    The manifest keeps the newest RESEARCH_MANIFEST_MAX_ENTRIES versions; files of older
+    versions are deleted once the new latest.json is stored.
+
+    Args:
+        department_code: Department identifier (e.g., 'CSCI').
+        research_data: Professors extracted in this run.
+        faculty_urls: Professor page urls on the faculty list this run. Listed professors
+            missing from research_data keep their previous record.
+
+    Returns:
+        The updated latest pointer.
+
+    Raises:
+        RuntimeError: The current snapshot or the manifest couldn't be loaded.
+    """
+    now = datetime.now(timezone.utc)
+    latest = _load(latest_path(RESEARCH_SOURCE, department_code))
+    previous = []
+    if latest:
+        previous = _load(latest["snapshot"])
+        if previous is None:
+            # Diffing against nothing would republish every professor as added
+            raise RuntimeError(f"Could not load research snapshot {latest['snapshot']} for {department_code}")
+
+    research_data = carry_over_failed(previous, research_data, faculty_urls)
+    delta = diff_research(previous, research_data, faculty_urls)
+    counts = {kind: len(records) for kind, records in delta.items()}
+    if latest and not any(counts.values()):
+        latest["checked_at"] = now.isoformat()
+        save_to_storage(latest, RESEARCH_BUCKET, latest_path(RESEARCH_SOURCE, department_code))
+        logger.info(f"Research for {department_code} unchanged since v{latest['version']}")
+        return latest
+
+    manifest = _load(manifest_path(RESEARCH_SOURCE, department_code))
+    if manifest is None:
+        if latest:
+            # The manifest is written before latest.json, so it can't legitimately be missing
+            raise RuntimeError(f"Could not load the research manifest for {department_code}")
+        manifest = {
+            "source": RESEARCH_SOURCE,
+            "key": department_code,
+            "version": 0,
+            "snapshots": [],
+            "deltas": [],
+        }
+    version = manifest["version"] + 1
+    date = now.strftime("%Y-%m-%d")
+    new_snapshot_path = snapshot_path(RESEARCH_SOURCE, department_code, version, date)
+    new_delta_path = delta_path(RESEARCH_SOURCE, department_code, version, date)
+
+    save_to_storage(research_data, RESEARCH_BUCKET, new_snapshot_path)
+    save_to_storage({
+        "department_code": department_code,
+        "version": version,
+        "base_version": manifest["version"],
+        "created_at": now.isoformat(),
+        **delta,
+    }, RESEARCH_BUCKET, new_delta_path)
+
+    max_entries = int(os.getenv("RESEARCH_MANIFEST_MAX_ENTRIES", DEFAULT_MAX_MANIFEST_ENTRIES))
+    snapshots = manifest["snapshots"] + [{"version": version, "path": new_snapshot_path, "created_at": now.isoformat(), "record_count": len(research_data)}]
+    deltas = manifest["deltas"] + [{"version": version, "path": new_delta_path, "created_at": now.isoformat(), **counts}]
+    manifest["snapshots"] = snapshots[-max_entries:]
+    manifest["deltas"] = deltas[-max_entries:]
+    expired = [entry["path"] for entry in snapshots[:-max_entries] + deltas[:-max_entries]]
+    manifest["version"] = version
+    manifest["updated_at"] = now.isoformat()
+    save_to_storage(manifest, RESEARCH_BUCKET, manifest_path(RESEARCH_SOURCE, department_code))
+
+    latest = {
+        "version": version,
+        "snapshot": new_snapshot_path,
+        "record_count": len(research_data),
+        "updated_at": now.isoformat(),
+        "checked_at": now.isoformat(),
+    }
+    save_to_storage(latest, RESEARCH_BUCKET, latest_path(RESEARCH_SOURCE, department_code))
+    # Nothing points at trimmed versions any more
+    delete_from_storage(RESEARCH_BUCKET, expired)
+    logger.info(f"Published research v{version} for {department_code}: {counts}")
+    return latest
+
+
+def load_latest_research(department_code: str) -> Optional[Tuple[List[Dict[str, Any]], float]]:
+    """
+    Load a department's current research snapshot through its latest pointer.
+
+    Returns:
+        The professors and the unix time of the last run that checked them, changed or
+        not, or None if nothing is stored.
+    """
+    latest = _load(latest_path(RESEARCH_SOURCE, department_code))
+    if latest is None:
+        return None
+    research_data = _load(latest["snapshot"])
+    if research_data is None:
+        return None
+    return research_data, datetime.fromisoformat(latest["checked_at"]).timestamp()
+
+
+def load_research_changes(department_code: str, since_version: int = 0) -> Optional[Dict[str, Any]]:
+    """
+    Load the deltas published for a department after since_version, oldest first.
+
+    Returns:
+        {"version", "complete", "deltas"}, or None if the department has no manifest. If
+        deltas older than the manifest keeps were requested, "complete" is False and the
+        caller should reload the full snapshot instead.
+    """
+    manifest = _load(manifest_path(RESEARCH_SOURCE, department_code))
+    if manifest is None:
+        return None
+    entries = [entry for entry in manifest["deltas"] if entry["version"] > since_version]
+    deltas = [delta for delta in (_load(entry["path"]) for entry in entries) if delta]
+    oldest = manifest["deltas"][0]["version"] if manifest["deltas"] else manifest["version"] + 1
+    return {
+        "version": manifest["version"],
+        "complete": since_version + 1 >= oldest and len(deltas) == len(entries),
+        "deltas": deltas,
+    }
@@ -1,2 +1,2 @@
-from .research_crawler import extract_research_by_department
-__all__ = ['extract_research_by_department']
\ No newline at end of file
+from .research_crawler import extract_research_by_department, stream_research_by_department, extract_faculty_urls
+__all__ = ['extract_research_by_department', 'stream_research_by_department', 'extract_faculty_urls']
\ No newline at end of file
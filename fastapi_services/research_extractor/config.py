@@ -1,4 +1,6 @@
-from typing import Dict, List
+import json
+import os
+from typing import Dict, List, Optional
 
 def get_base_urls() -> Dict[str, str]:
     """
@@ -20,6 +22,45 @@ def get_faculty_urls() -> Dict[str, str]:
         "MATH": "https://mathematics.wwu.edu/directory",
     }
 
+def get_pipeline_config() -> Dict[str, int]:
+    """
+    Get concurrency settings for the crawl-and-extract pipeline. Crawled pages wait in a
+    queue of at most queue_size pages for the LLM stage; when it is full, crawling pauses.
+    Pages that failed to crawl or extract are run through the pipeline again, on their
+    own, up to failed_page_retries times.
+    """
+    return {
+        "crawl_concurrency": int(os.getenv("RESEARCH_CRAWL_CONCURRENCY", 5)),
+        "llm_concurrency": int(os.getenv("RESEARCH_LLM_CONCURRENCY", 5)),
+        "queue_size": int(os.getenv("RESEARCH_PIPELINE_QUEUE_SIZE", 10)),
+        "failed_page_retries": int(os.getenv("RESEARCH_FAILED_PAGE_RETRIES", 1)),
+    }
+
+def get_revalidation_config() -> Dict:
+    """
+    Get settings for revalidating faculty and professor pages with conditional HTTP requests
+    before crawling them. Pages that didn't change reuse what was extracted last time, until
+    that is max_age_days old.
+    """
+    return {
+        "enabled": os.getenv("RESEARCH_REVALIDATION_ENABLED", "true").lower() in ("1", "true", "yes"),
+        "max_age_days": float(os.getenv("RESEARCH_REVALIDATION_MAX_AGE_DAYS", 30)),
+        "max_concurrent": int(os.getenv("RESEARCH_REVALIDATION_MAX_CONCURRENT", 10)),
+        "timeout_seconds": float(os.getenv("RESEARCH_REVALIDATION_TIMEOUT", 15)),
+    }
+
+def get_pruning_config() -> Dict:
+    """
+    Get settings for trimming professor pages before the LLM call. When enabled, only the
+    sections matched by the profile schema are sent, or the page without navigation
+    link lists when the schema doesn't match. Either way the prompt is cut to
+    max_tokens estimated tokens.
+    """
+    return {
+        "enabled": os.getenv("RESEARCH_PRUNING_ENABLED", "true").lower() in ("1", "true", "yes"),
+        "max_tokens": int(os.getenv("RESEARCH_MAX_PROMPT_TOKENS", 2000)),
+    }
+
 def get_llm_prompt() -> List[Dict[str, str]]:
     """
     Get the LLM prompt template for extracting professor information.
@@ -61,17 +102,24 @@ def get_faculty_page_schema() -> Dict:
         ]
     }
 
-def get_professor_profile_schema() -> Dict:
+def get_professor_profile_schema(department_code: Optional[str] = None) -> Dict:
     """
     CSS extraction schema for extracting professor information from professor profile pages.
-    Note: Currently works for CSCI department pages, may need adjustment for other departments.
+    Field names match ProfessorPage. Departments whose pages use another layout get their
+    schema from get_professor_profile_schema_overrides; the rest use the CSCI layout.
+
+    Args:
+        department_code: Department identifier (e.g., 'CSCI'). None returns the default schema.
     """
+    overrides = get_professor_profile_schema_overrides()
+    if department_code in overrides:
+        return overrides[department_code]
     return {
         "name": "Professor Page",
         "baseSelector" : "body",
         "fields": [
             {
-                "name": "professor_name",
+                "name": "name",
                 "selector": "h1.field-content",
                 "type": "text",
                 "default": "None"
@@ -90,4 +138,37 @@ def get_professor_profile_schema() -> Dict:
                 "default": "None"
             },
         ]
-    }
\ No newline at end of file
+    }
+
+def get_professor_profile_schema_overrides() -> Dict[str, Dict]:
+    """
+    Per-department profile schemas. RESEARCH_PROFILE_SCHEMA_<DEPT> may hold a schema as JSON,
+    e.g. RESEARCH_PROFILE_SCHEMA_MATH, for departments whose pages differ from CSCI's.
+    """
+    overrides = {}
+    for department_code in get_base_urls():
+        schema = os.getenv(f"RESEARCH_PROFILE_SCHEMA_{department_code}")
+        if schema:
+            overrides[department_code] = json.loads(schema)
+    return overrides
+
+def get_extraction_config() -> Dict:
+    """
+    Get how professor pages are extracted. mode is "hybrid" (CSS schema first, LLM when
+    a required field is missing), "llm" (every page through the LLM) or "css" (schema only,
+    pages it can't read are skipped). required lists the ProfessorPage fields the schema
+    must find for its result to be used.
+    """
+    return {
+        "mode": os.getenv("RESEARCH_EXTRACTION_MODE", "hybrid").lower(),
+        "required": [field.strip() for field in os.getenv("RESEARCH_CSS_REQUIRED_FIELDS", "name,research_interest").split(",") if field.strip()],
+    }
+
+def get_llm_backends() -> str:
+    """
+    Get the LLM backends used to extract professor pages, as a comma-separated list of
+    provider:model[@base_url] entries (see shared_utils.llm_router.parse_backends).
+    Several backends spread calls across them, e.g. local Ollama replicas plus Gemini.
+    Set with RESEARCH_LLM_BACKENDS, or LLM_BACKENDS for every extractor.
+    """
+    return os.getenv("RESEARCH_LLM_BACKENDS") or os.getenv("LLM_BACKENDS") or "google-genai:gemini-2.5-flash-lite"
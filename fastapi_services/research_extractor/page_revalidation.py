@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import time
+
+import httpx
+from bs4 import BeautifulSoup
+from typing import List, Dict, Optional, Tuple
+
+import sys
+import os
+
+# Add the fastapi_services directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared_utils import get_record_store, content_hash, RecordStore
+from research_extractor import config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def get_page_store() -> RecordStore:
+    """
+    Store of fetch metadata per page url: the ETag, Last-Modified and text hash of the
+    page when it was last extracted, and what was extracted from it.
+    """
+    return get_record_store("research_pages")
+
+
+def page_text_hash(html: str) -> str:
+    """
+    Hash of a page's visible text, so per-request tokens in attributes or scripts don't
+    make an unchanged page look changed.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    for element in soup(["script", "style", "noscript"]):
+        element.decompose()
+    return content_hash(soup.get_text(" ", strip=True))
+
+
+async def revalidate_page(client: httpx.AsyncClient, url: str, stored: Optional[Dict]) -> Tuple[str, Dict]:
+    """
+    Conditional GET of url using the validators stored for it.
+
+    Returns:
+        ("unchanged" | "changed" | "error", validators) where validators holds the etag,
+        last_modified and content_hash to store with the page's next extraction.
+    """
+    headers = {}
+    if stored:
+        if stored["value"].get("etag"):
+            headers["If-None-Match"] = stored["value"]["etag"]
+        if stored["value"].get("last_modified"):
+            headers["If-Modified-Since"] = stored["value"]["last_modified"]
+    try:
+        response = await client.get(url, headers=headers)
+    except httpx.HTTPError as e:
+        logger.warning(f"Revalidation request failed for {url}: {e}")
+        return "error", {}
+
+    if response.status_code == 304 and stored:
+        return "unchanged", {
+            "etag": response.headers.get("ETag") or stored["value"].get("etag"),
+            "last_modified": response.headers.get("Last-Modified") or stored["value"].get("last_modified"),
+            "content_hash": stored["content_hash"],
+        }
+    if response.status_code != 200:
+        logger.warning(f"Revalidation of {url} returned HTTP {response.status_code}")
+        return "error", {}
+
+    validators = {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "content_hash": page_text_hash(response.text),
+    }
+    if stored and stored["content_hash"] == validators["content_hash"]:
+        return "unchanged", validators
+    return "changed", validators
+
+
+async def revalidate_pages(urls: List[str], stats: Optional[Dict] = None) -> Tuple[Dict[str, Dict], Dict[str, Dict]]:
+    """
+    Check which pages changed since they were last extracted, without rendering them.
+    Pages extracted more than max_age_days ago count as changed so they are re-extracted.
+
+    Args:
+        urls: Page urls to check.
+        stats: Optional dictionary that receives pages_unchanged, pages_changed and
+            revalidation_errors counts.
+
+    Returns:
+        (unchanged, validators): the stored value of each unchanged page keyed by url, and
+        the fetch validators of every page that answered, to pass to remember_page.
+    """
+    revalidation_config = config.get_revalidation_config()
+    stats = {} if stats is None else stats
+    for counter in ("pages_unchanged", "pages_changed", "revalidation_errors"):
+        stats.setdefault(counter, 0)
+    store = get_page_store()
+    # One query for every page, off the event loop
+    stored_pages = await asyncio.to_thread(store.get_many, urls)
+    oldest = time.time() - revalidation_config["max_age_days"] * 24 * 60 * 60
+    semaphore = asyncio.Semaphore(revalidation_config["max_concurrent"])
+    limits = httpx.Limits(max_connections=revalidation_config["max_concurrent"], max_keepalive_connections=revalidation_config["max_concurrent"])
+    unchanged = {}
+    validators = {}
+
+    async def check(client, url):
+        stored = stored_pages.get(url)
+        if stored and stored["value"].get("extracted_at", 0) < oldest:
+            stored = None
+        async with semaphore:
+            status, page_validators = await revalidate_page(client, url, stored)
+        if page_validators:
+            validators[url] = page_validators
+        if status == "unchanged":
+            stats["pages_unchanged"] += 1
+            unchanged[url] = stored["value"]
+        elif status == "changed":
+            stats["pages_changed"] += 1
+        else:
+            stats["revalidation_errors"] += 1
+
+    async with httpx.AsyncClient(timeout=revalidation_config["timeout_seconds"], limits=limits, follow_redirects=True) as client:
+        await asyncio.gather(*[check(client, url) for url in urls])
+    logger.info(f"Revalidated {len(urls)} pages: {len(unchanged)} unchanged")
+    return unchanged, validators
+
+
+def remember_page(url: str, validators: Optional[Dict], value: Dict):
+    """
+    Store what was extracted from a page along with the validators it was fetched with.
+    Pages without validators are stored too, and are re-extracted on the next run.
+    This commits to SQLite, so async callers run it with asyncio.to_thread.
+    """
+    validators = validators or {}
+    get_page_store().put(url, {
+        **value,
+        "etag": validators.get("etag"),
+        "last_modified": validators.get("last_modified"),
+        "extracted_at": time.time(),
+    }, validators.get("content_hash"))
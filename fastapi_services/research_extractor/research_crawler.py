@@ -2,11 +2,13 @@ import asyncio
 import json
 import os
 import logging
+import re
 
-from crawl4ai import AsyncWebCrawler, CrawlerRunConfig, JsonCssExtractionStrategy, BrowserConfig
+from bs4 import BeautifulSoup
+from crawl4ai import CrawlerRunConfig, JsonCssExtractionStrategy, BrowserConfig
 from urllib.parse import urljoin, urlparse
-from typing import List, Dict
-from pydantic import BaseModel, Field
+from typing import AsyncIterator, List, Dict, Optional
+from pydantic import BaseModel, Field, ValidationError
 from langchain_core.prompts import ChatPromptTemplate
 
 import sys
@@ -16,9 +18,13 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from shared_utils import csv_writer
-from shared_utils import llm_init
-from shared_utils import llm_ainvoke_batch
+from shared_utils import llm_route, parse_backends, routing_labels
+from shared_utils import llm_invoker
+from shared_utils import cache_scope
+from shared_utils import browser_session
+from shared_utils import truncate_to_tokens
 from research_extractor import config
+from research_extractor.page_revalidation import revalidate_pages, remember_page
 
 
 # Configure logging
@@ -32,6 +38,153 @@ class ProfessorPage(BaseModel):
     research_interest: List[str] = Field(default_factory=list, description="List of professor's research interests")
     src_url: str = Field(..., description="Source URL of the professor's page")
 
+# Markdown lines made only of links or images. Runs of them are navigation menus,
+# sidebars and footers; a lone one may be the professor's website, so it is kept.
+LINK_ONLY_LINE = re.compile(r"^\s*(?:[*+-]|\d+\.)?\s*(?:!?\[[^\]]*\]\([^)]*\)[\s|]*)+$")
+MIN_LINK_RUN = 3
+
+def drop_link_runs(markdown: str) -> str:
+    """
+    Removes runs of MIN_LINK_RUN or more consecutive link-only lines from markdown.
+    """
+    kept = []
+    run = []
+    for line in markdown.splitlines() + [""]:
+        if LINK_ONLY_LINE.match(line):
+            run.append(line)
+            continue
+        if len(run) < MIN_LINK_RUN:
+            kept.extend(run)
+        run = []
+        kept.append(line)
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(kept)).strip()
+
+def schema_sections(html: str, schema: Dict) -> str:
+    """
+    Renders the elements matched by a profile CSS schema as markdown sections, one heading
+    per field. Returns an empty string unless every field matches, since a field missing
+    from the sections would be missing from the LLM's prompt too.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    sections = []
+    for field in schema["fields"]:
+        try:
+            elements = soup.select(field["selector"])
+        except Exception as e:
+            logger.warning(f"Invalid profile selector {field['selector']}: {e}")
+            elements = []
+        lines = []
+        for element in elements:
+            text = element.get_text(" ", strip=True)
+            if field["type"] == "attribute":
+                value = element.get(field["attribute"])
+                if value:
+                    lines.append(f"[{text or value}]({value})")
+            elif text:
+                lines.append(text)
+        if not lines:
+            return ""
+        heading = field["name"].replace("_", " ").title()
+        sections.append(f"## {heading}\n" + "\n".join(lines))
+    return "\n\n".join(sections)
+
+def prefilter_professor_page(html: str, markdown: str, stats: Optional[Dict] = None, schema: Optional[Dict] = None, use_schema: bool = True) -> str:
+    """
+    Reduce a professor page to the parts the LLM needs before extraction: the sections
+    matched by the profile schema, or the markdown without navigation link lists when the
+    schema doesn't find every field on the page. The result is cut to the configured token budget.
+
+    Args:
+        html: Page HTML, matched against the profile schema.
+        markdown: crawl4ai markdown of the page, used when a schema field doesn't match.
+        stats: Optional dictionary that receives markdown_bytes_before, markdown_bytes_after,
+            pruned_by_schema and truncated counts.
+        schema: Profile CSS schema for the page's department. Defaults to the CSCI layout.
+        use_schema: Whether to try the schema at all. Pass False for pages the schema
+            already failed to read, so only link runs are stripped.
+
+    Returns:
+        Markdown to send to the LLM.
+    """
+    pruning_config = config.get_pruning_config()
+    stats = {} if stats is None else stats
+    for counter in ("markdown_bytes_before", "markdown_bytes_after", "pruned_by_schema", "truncated"):
+        stats.setdefault(counter, 0)
+    stats["markdown_bytes_before"] += len(markdown.encode("utf-8"))
+
+    pruned = ""
+    if use_schema:
+        try:
+            pruned = schema_sections(html or "", schema or config.get_professor_profile_schema())
+        except Exception as e:
+            logger.error(f"Error matching profile schema: {e}")
+    if pruned:
+        stats["pruned_by_schema"] += 1
+    else:
+        pruned = drop_link_runs(markdown)
+
+    trimmed = truncate_to_tokens(pruned, pruning_config["max_tokens"])
+    if len(trimmed) < len(pruned):
+        stats["truncated"] += 1
+    stats["markdown_bytes_after"] += len(trimmed.encode("utf-8"))
+    return trimmed
+
+def split_interests(text: str) -> List[str]:
+    """
+    Splits a research interests paragraph like "Machine learning; robotics, and HCI" into a list.
+    """
+    interests = []
+    for part in re.split(r"[;,\n•]", text):
+        part = re.sub(r"^(and|&)\s+", "", part.strip()).strip(" .")
+        if part:
+            interests.append(part)
+    return interests
+
+def extract_with_schema(html: str, url: str, schema: Dict, required: List[str]) -> Optional[Dict]:
+    """
+    Extracts a professor from page HTML with a profile CSS schema, without the LLM.
+
+    Args:
+        html: Page HTML.
+        url: Page URL, used as src_url and to resolve a relative website link.
+        schema: Profile CSS schema whose field names match ProfessorPage.
+        required: Fields the schema must find, e.g. ["name", "research_interest"].
+
+    Returns:
+        The ProfessorPage as a dictionary, or None if a required field is missing or the
+        result doesn't validate, in which case the page should go to the LLM.
+    """
+    if not html:
+        return None
+    try:
+        items = JsonCssExtractionStrategy(schema).extract(url, html)
+    except Exception as e:
+        logger.warning(f"CSS extraction failed for {url}: {e}")
+        return None
+    if not items:
+        return None
+
+    # Fields that didn't match hold the schema default "None"
+    fields = {key: value for key, value in items[0].items() if value and value != "None"}
+    missing = [field for field in required if field not in fields]
+    if missing:
+        logger.info(f"CSS schema missed {missing} for {url}")
+        return None
+
+    interests = fields.get("research_interest", [])
+    if isinstance(interests, str):
+        interests = split_interests(interests)
+    try:
+        return ProfessorPage(
+            name=fields.get("name", ""),
+            website=urljoin(url, fields["website"]) if "website" in fields else "N/A",
+            research_interest=interests,
+            src_url=url
+        ).model_dump()
+    except ValidationError as e:
+        logger.info(f"CSS result for {url} failed validation: {e}")
+        return None
+
 async def extract_faculty_urls(department_code:str, debug_mode: bool=False) -> List[str]:
     """
     Extracts all professor profile URLS from a department's faculty page.
@@ -61,8 +214,17 @@ async def extract_faculty_urls(department_code:str, debug_mode: bool=False) -> L
     base_url = base_urls[department_code]
     faculty_url = faculty_urls[department_code]
 
+    # Reuse the last faculty list if the listing page hasn't changed
+    revalidate = config.get_revalidation_config()["enabled"]
+    validators = {}
+    if revalidate:
+        unchanged, validators = await revalidate_pages([faculty_url])
+        if faculty_url in unchanged:
+            logger.info(f"Faculty page {faculty_url} unchanged. Reusing stored professor urls.")
+            return unchanged[faculty_url]["urls"]
+
     # Run crawler
-    async with AsyncWebCrawler(config=browser_config) as crawler:
+    async with browser_session(browser_config) as crawler:
         results = await crawler.arun(faculty_url, config=crawler_config)
         if not results.extracted_content:
             logger.warning(f"No content extracted from {faculty_url}.")
@@ -74,89 +236,278 @@ async def extract_faculty_urls(department_code:str, debug_mode: bool=False) -> L
             # Crawled page provides relative urls like '/wolterp'. Join the base url to create an absolute url
             absolute_url = urljoin(base_url, page["professor_page_url"])
             all_pages.add(absolute_url)
+        if revalidate and all_pages:
+            await asyncio.to_thread(remember_page, faculty_url, validators.get(faculty_url), {"urls": list(all_pages)})
         return list(all_pages)
 
 
-async def extract_professor_information(url_list: List, debug_mode: bool=False) -> List[dict]:
+async def pipeline_professor_information(url_list: List, debug_mode: bool=False, stats: Optional[Dict] = None, department_code: Optional[str] = None) -> AsyncIterator[dict]:
     """
-    Extract professor information from a list of URLs using async processing.
+    Crawls professor pages and extracts their information as a pipeline: each page is
+    handed to the LLM stage as soon as it is crawled, so browser and LLM latency overlap.
+    Crawling and extraction have separate concurrency limits, and a bounded queue between
+    them pauses crawling when the LLM stage falls behind.
+
+    In hybrid mode (see config.get_extraction_config) pages are first read with the
+    department's profile CSS schema and only go to the LLM when a required field is missing.
+    With revalidation enabled, pages whose conditional request shows them unchanged are not
+    crawled at all; the professor stored from their last extraction is emitted instead.
+
+    Args:
+        url_list: List of professor page URLs to process
+        debug_mode: Whether to run in debug mode (non-headless browser)
+        stats: Optional dictionary that receives LLM call counts, CSS extraction counts
+            (css_extracted, css_missed), revalidation counts, prompt pruning metrics and
+            failed_pages, the error for each url that couldn't be crawled or extracted
+        department_code: Department the pages belong to, selects the profile schema
+
+    Yields:
+        Each professor's information as soon as it is extracted.
+    """
+    pipeline_config = config.get_pipeline_config()
+    extraction_config = config.get_extraction_config()
+    schema = config.get_professor_profile_schema(department_code)
+    prune = config.get_pruning_config()["enabled"]
+    stats = {} if stats is None else stats
+    stats.setdefault("css_extracted", 0)
+    stats.setdefault("css_missed", 0)
+    failed_pages = stats.setdefault("failed_pages", {})
+    backends = parse_backends(config.get_llm_backends())
+    model, model_provider = routing_labels(backends)
+    prompt_template = ChatPromptTemplate.from_messages(config.get_llm_prompt())
+    llm_chain = llm_route(prompt_template, ProfessorPage, backends)
+    invoke = llm_invoker(
+        llm_chain,
+        max_concurrent=pipeline_config["llm_concurrency"],
+        cache_scope=cache_scope(prompt_template, ProfessorPage, model),
+        provider=model_provider,
+        stats=stats,
+        detailed=True
+    )
+    browser_config = BrowserConfig(headless= (not debug_mode))
+
+    revalidate = config.get_revalidation_config()["enabled"]
+    unchanged = {}
+    validators = {}
+    if revalidate:
+        unchanged, validators = await revalidate_pages(url_list, stats)
+
+    url_queue = asyncio.Queue()
+    for url in url_list:
+        if url not in unchanged:
+            url_queue.put_nowait(url)
+    page_queue = asyncio.Queue(maxsize=pipeline_config["queue_size"])
+    output_queue = asyncio.Queue()
+    done = object()
+    for url, stored in unchanged.items():
+        output_queue.put_nowait(stored["professor"])
+
+    async def extracted(url, professor):
+        if revalidate and professor:
+            try:
+                await asyncio.to_thread(remember_page, url, validators.get(url), {"professor": professor})
+            except Exception as e:
+                # The page is just re-extracted next run
+                logger.warning(f"Could not store {url} for revalidation: {e}")
+
+    async def crawl_worker(crawler):
+        while not url_queue.empty():
+            url = url_queue.get_nowait()
+            try:
+                result = await crawler.arun(url)
+            except Exception as e:
+                logger.error(f"Error crawling {url}: {e}")
+                failed_pages[url] = f"{type(e).__name__}: {e}"
+                continue
+            if not (result.success and result.markdown):
+                logger.warning(f"Skipping professor. No markdown found for {url}")
+                failed_pages[url] = result.error_message or "No markdown found"
+                continue
+            if extraction_config["mode"] != "llm":
+                professor = extract_with_schema(result.html, result.url, schema, extraction_config["required"])
+                if professor:
+                    stats["css_extracted"] += 1
+                    await extracted(url, professor)
+                    await output_queue.put(professor)
+                    continue
+                stats["css_missed"] += 1
+                if extraction_config["mode"] == "css":
+                    logger.warning(f"Skipping professor. CSS schema could not read {url}")
+                    continue
+            await page_queue.put((url, result))
+
+    async def llm_worker():
+        while True:
+            item = await page_queue.get()
+            if item is None:
+                return
+            url, page = item
+            professor = None
+            error = None
+            try:
+                markdown = str(page.markdown)
+                if prune:
+                    # Outside llm mode the page is here because the schema couldn't read it
+                    markdown = prefilter_professor_page(page.html, markdown, stats, schema, use_schema=extraction_config["mode"] == "llm")
+                outcome = await invoke({"markdown": markdown, "src_url": page.url}, page.url)
+                professor = outcome["data"]
+                error = outcome["error"]
+                await extracted(url, professor)
+            except Exception as e:
+                # Keep the worker alive, or crawl workers block forever on the full page queue
+                logger.error(f"Error extracting professor from {page.url}: {e}")
+                error = f"{type(e).__name__}: {e}"
+            if professor is None:
+                # Keyed by the listed url, not the redirect target, so it can be retried
+                failed_pages[url] = error or "LLM returned no structured output"
+            await output_queue.put(professor)
+
+    async def run(crawler):
+        llm_workers = [asyncio.create_task(llm_worker()) for _ in range(pipeline_config["llm_concurrency"])]
+        try:
+            await asyncio.gather(*[crawl_worker(crawler) for _ in range(pipeline_config["crawl_concurrency"])])
+            logger.info(f"Completed crawling {len(url_list) - len(unchanged)} pages")
+            for _ in llm_workers:
+                await page_queue.put(None)
+            await asyncio.gather(*llm_workers)
+            logger.info(f"Research pipeline stats: {stats}")
+            if failed_pages:
+                logger.warning(f"Extraction failed for {len(failed_pages)} pages: {list(failed_pages)}")
+        finally:
+            for worker in llm_workers:
+                worker.cancel()
+            await output_queue.put(done)
+
+    if url_queue.empty():
+        logger.info(f"All {len(url_list)} professor pages unchanged. Skipping crawl.")
+        for professor in unchanged.values():
+            yield professor["professor"]
+        return
+
+    logger.info(f"Starting pipelined extraction for {len(url_list)} professor URLs")
+    async with browser_session(browser_config) as crawler:
+        runner = asyncio.create_task(run(crawler))
+        try:
+            while True:
+                professor = await output_queue.get()
+                if professor is done:
+                    break
+                if professor:
+                    yield professor
+            # surface crawl errors that ended the pipeline
+            await runner
+        finally:
+            # stop crawling before the browser goes back to the pool
+            runner.cancel()
+            await asyncio.gather(runner, return_exceptions=True)
+
+async def extract_professor_information(url_list: List, debug_mode: bool=False, department_code: Optional[str] = None) -> List[dict]:
+    """
+    Extract professor information from a list of URLs using async processing. Pages that
+    fail to crawl or extract are retried on their own afterwards, up to the pipeline's
+    failed_page_retries, instead of re-running every page.
     
     Args:
         url_list: List of professor page URLs to process
         debug_mode: Whether to run in debug mode (non-headless browser)
+        department_code: Department the pages belong to, selects the profile CSS schema
         
     Returns:
         List of processed professor information dictionaries
     """
     logger.info(f"Starting extraction for {len(url_list)} professor URLs")
-    
-    prompt_template = ChatPromptTemplate.from_messages(config.get_llm_prompt())
-    llm_chain = llm_init(prompt_template, ProfessorPage, model="gemini-2.5-flash-lite", model_provider="google-genai")
-    browser_config = BrowserConfig(headless= (not debug_mode))
 
-    try:
-        async with AsyncWebCrawler(config=browser_config) as crawler:
-            # returns a list of crawlerrun objects
-            logger.info("Starting concurrent web crawling...")
-            professor_info_list = await crawler.arun_many(url_list)
-            logger.info(f"Completed crawling {len(professor_info_list)} pages")
-
-            
-            # Process all LLM calls concurrently
-            if professor_info_list:
-                research_info = await llm_ainvoke_batch(
-                    llm_chain, 
-                    professor_info_list, 
-                    max_concurrent=5 
-                )
-                logger.info(f"Successfully processed {len(research_info)} professor profiles")
-            else:
-                logger.warning("No markdown content found for LLM processing")
+    retries = config.get_pipeline_config()["failed_page_retries"]
+    research_info = []
+    pending = url_list
+    for attempt in range(retries + 1):
+        stats = {}
+        try:
+            async for professor in pipeline_professor_information(pending, debug_mode, stats, department_code):
+                research_info.append(professor)
+        except Exception as e:
+            logger.error(f"Error during professor information extraction: {e}")
+            if attempt == 0:
                 research_info = []
-                
-    except Exception as e:
-        logger.error(f"Error during professor information extraction: {e}")
-        research_info = []
-            
+            break
+        pending = list(stats.get("failed_pages", {}))
+        if not pending:
+            break
+        if attempt < retries:
+            logger.info(f"Retrying {len(pending)} failed professor pages: {pending}")
+
+    logger.info(f"Successfully processed {len(research_info)} professor profiles")
+    if pending:
+        logger.warning(f"Giving up on {len(pending)} professor pages: {pending}")
     return research_info
 
-async def extract_department_research(department_code, debug_mode=False) -> List[dict]:
+async def stream_professor_information(url_list: List, debug_mode: bool=False, department_code: Optional[str] = None) -> AsyncIterator[dict]:
+    """
+    Streaming version of extract_professor_information.
+
+    Yields:
+        Each professor's information as soon as its LLM call completes.
+    """
+    async for professor in pipeline_professor_information(url_list, debug_mode, department_code=department_code):
+        yield professor
+
+async def extract_department_research(department_code, debug_mode=False, faculty_urls: Optional[List[str]] = None) -> List[dict]:
     """
     Extracts research information and more from all professors in a department.
 
     Args:
         department_code: Department identifier to extracti info from.
+        faculty_urls: Professor page urls from extract_faculty_urls, if the caller already has them.
 
     Return:
         List dictionaries containing all professors' research information.
     """
 
-    faculty_urls = await extract_faculty_urls(department_code, debug_mode=debug_mode)
+    if faculty_urls is None:
+        faculty_urls = await extract_faculty_urls(department_code, debug_mode=debug_mode)
     if not faculty_urls:
         logger.warning(f"No faculty URLs found for department: {department_code}")
         return []
 
-    research_info = await extract_professor_information(faculty_urls, debug_mode=debug_mode)
+    research_info = await extract_professor_information(faculty_urls, debug_mode=debug_mode, department_code=department_code)
     return research_info
 
 
 # 'public' wrapper. Other files import this function
-async def extract_research_by_department(department_code: str, debug_mode: bool=False, write_to_csv: bool = False) -> List[Dict]:
+async def extract_research_by_department(department_code: str, debug_mode: bool=False, write_to_csv: bool = False, faculty_urls: Optional[List[str]] = None) -> List[Dict]:
     """
     Main function to extract research information for a specific department.
 
     Args:
         department_code: Department identifier (e.g., 'cs', 'math')
+        faculty_urls: Professor page urls from extract_faculty_urls, if the caller already has them.
 
     Returns:
         List of professor research information
     """
 
-    research_info = await extract_department_research(department_code, debug_mode)
+    research_info = await extract_department_research(department_code, debug_mode, faculty_urls)
     if research_info and write_to_csv:
         csv_writer(research_info, f"research_{department_code}.csv")
     return research_info
 
+async def stream_research_by_department(department_code: str, debug_mode: bool=False) -> AsyncIterator[Dict]:
+    """
+    Streaming version of extract_research_by_department.
+
+    Args:
+        department_code: Department identifier (e.g., 'cs', 'math')
+
+    Yields:
+        Each professor's research information as soon as it is extracted
+    """
+    faculty_urls = await extract_faculty_urls(department_code, debug_mode=debug_mode)
+    if not faculty_urls:
+        logger.warning(f"No faculty URLs found for department: {department_code}")
+        return
+    async for professor in stream_professor_information(faculty_urls, debug_mode=debug_mode, department_code=department_code):
+        yield professor
+
 if __name__ == "__main__":
     res = asyncio.run(extract_research_by_department("CSCI", debug_mode=True, write_to_csv=True))
     print(res)
\ No newline at end of file
@@ -1,5 +1,19 @@
 from .csv_writer import csv_writer
-from .llm_init import llm_init
-from .llm_batch_processor import llm_ainvoke_batch
+from .llm_init import llm_init, get_chat_model, clear_llm_registry
+from .llm_batch_processor import llm_ainvoke_batch_courses, llm_ainvoke_many, llm_astream_many, llm_invoker
+from .llm_router import LLMRouter, llm_route, parse_backends, routing_labels
+from .llm_cache import LLMCache, get_llm_cache, cache_scope
+from .prompt_packing import estimate_tokens, pack_blocks, truncate_to_tokens
+from .record_store import RecordStore, get_record_store, content_hash
+from .rate_limiter import get_rate_limiter, get_retry_config
+from .single_flight import SingleFlight
+from .browser_pool import BrowserPool, browser_session, get_browser_pool, set_browser_pool, get_browser_pool_config
 
-__all__ = ['csv_writer', 'llm_init', 'llm_ainvoke_batch']
\ No newline at end of file
+__all__ = ['csv_writer', 'llm_init', 'get_chat_model', 'clear_llm_registry', 'llm_ainvoke_batch_courses', 'llm_ainvoke_many', 'llm_astream_many', 'llm_invoker',
+           'LLMRouter', 'llm_route', 'parse_backends', 'routing_labels',
+           'LLMCache', 'get_llm_cache', 'cache_scope',
+           'estimate_tokens', 'pack_blocks', 'truncate_to_tokens',
+           'RecordStore', 'get_record_store', 'content_hash',
+           'get_rate_limiter', 'get_retry_config',
+           'SingleFlight',
+           'BrowserPool', 'browser_session', 'get_browser_pool', 'set_browser_pool', 'get_browser_pool_config']
\ No newline at end of file
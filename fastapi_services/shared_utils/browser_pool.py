@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from crawl4ai import AsyncWebCrawler, BrowserConfig
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 2
+DEFAULT_MAX_USES = 50
+
+
+def _is_healthy(crawler: AsyncWebCrawler) -> bool:
+    """
+    Checks that a crawler is started and its underlying browser is still connected.
+    """
+    if not getattr(crawler, "ready", True):
+        return False
+    browser_manager = getattr(getattr(crawler, "crawler_strategy", None), "browser_manager", None)
+    browser = getattr(browser_manager, "browser", None)
+    if browser is not None and not browser.is_connected():
+        return False
+    return True
+
+
+class BrowserPool:
+    """
+    A fixed-size pool of long-lived crawlers. Each crawler owns one browser and is lent
+    out exclusively, so sessions opened by one extractor are never shared with another.
+    Crawlers whose browser has crashed, or that have served max_uses borrows, are
+    closed and replaced with a fresh one when they are returned.
+    """
+
+    def __init__(self, size: int = DEFAULT_POOL_SIZE, browser_config: Optional[BrowserConfig] = None, max_uses: int = DEFAULT_MAX_USES):
+        self.size = size
+        self.browser_config = browser_config or BrowserConfig(headless=True)
+        self.max_uses = max_uses
+        self._available: asyncio.Queue = asyncio.Queue()
+        self._uses = {}
+        self._crawlers = []
+
+    async def _launch(self) -> AsyncWebCrawler:
+        crawler = AsyncWebCrawler(config=self.browser_config)
+        await crawler.start()
+        self._uses[id(crawler)] = 0
+        self._crawlers.append(crawler)
+        return crawler
+
+    async def _discard(self, crawler: AsyncWebCrawler):
+        self._uses.pop(id(crawler), None)
+        if crawler in self._crawlers:
+            self._crawlers.remove(crawler)
+        try:
+            await crawler.close()
+        except Exception as e:
+            logger.warning(f"Error closing pooled browser: {e}")
+
+    async def _recycle(self, crawler: AsyncWebCrawler) -> AsyncWebCrawler:
+        logger.info("Recycling pooled browser")
+        await self._discard(crawler)
+        return await self._launch()
+
+    async def start(self):
+        """
+        Launch every browser in the pool concurrently.
+        """
+        crawlers = await asyncio.gather(*[self._launch() for _ in range(self.size)])
+        for crawler in crawlers:
+            self._available.put_nowait(crawler)
+        logger.info(f"Browser pool started with {self.size} browsers")
+
+    async def close(self):
+        """
+        Close every browser owned by the pool.
+        """
+        for crawler in list(self._crawlers):
+            await self._discard(crawler)
+        logger.info("Browser pool closed")
+
+    @asynccontextmanager
+    async def acquire(self):
+        """
+        Borrow a crawler from the pool, waiting if every crawler is in use.
+        """
+        crawler = await self._available.get()
+        try:
+            if not _is_healthy(crawler):
+                crawler = await self._recycle(crawler)
+            self._uses[id(crawler)] = self._uses.get(id(crawler), 0) + 1
+            yield crawler
+        finally:
+            try:
+                if not _is_healthy(crawler) or (self.max_uses and self._uses.get(id(crawler), 0) >= self.max_uses):
+                    crawler = await self._recycle(crawler)
+            except Exception as e:
+                logger.error(f"Failed to recycle pooled browser: {e}")
+            self._available.put_nowait(crawler)
+
+
+_browser_pool: Optional[BrowserPool] = None
+
+
+def get_browser_pool_config() -> dict:
+    """
+    Get browser pool settings from BROWSER_POOL_SIZE and BROWSER_POOL_MAX_USES.
+    """
+    return {
+        "size": int(os.getenv("BROWSER_POOL_SIZE", DEFAULT_POOL_SIZE)),
+        "max_uses": int(os.getenv("BROWSER_POOL_MAX_USES", DEFAULT_MAX_USES)),
+    }
+
+
+def set_browser_pool(pool: Optional[BrowserPool]):
+    global _browser_pool
+    _browser_pool = pool
+
+
+def get_browser_pool() -> Optional[BrowserPool]:
+    return _browser_pool
+
+
+@asynccontextmanager
+async def browser_session(browser_config: BrowserConfig):
+    """
+    Yields a crawler for the given browser config. Headless requests borrow from the
+    shared pool when one is running; otherwise (debug mode, scripts) a dedicated crawler
+    is launched and closed.
+    """
+    pool = get_browser_pool()
+    if pool is not None and browser_config.headless:
+        async with pool.acquire() as crawler:
+            yield crawler
+    else:
+        async with AsyncWebCrawler(config=browser_config) as crawler:
+            yield crawler
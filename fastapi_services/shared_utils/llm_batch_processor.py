@@ -1,70 +1,194 @@
 import asyncio
+import contextlib
+import json
 import logging
+import time
+
+from .llm_cache import get_llm_cache, cache_key
+from .llm_router import LLMRouter
+from .prompt_packing import estimate_tokens
+from .rate_limiter import get_rate_limiter, get_retry_config, backoff_delay, is_overload_error
 
 logger = logging.getLogger(__name__)
 
-async def llm_ainvoke_batch(llm_chain, professor_info_list, max_concurrent=5):
+def _log_stats(stats):
+    if stats.get("llm_retried") or stats.get("llm_dropped"):
+        logger.warning(f"LLM batch stats: {stats}")
+    else:
+        logger.info(f"LLM batch stats: {stats}")
+
+def llm_invoker(llm_chain, max_concurrent=None, cache_scope=None, provider=None, stats=None, detailed=False):
     """
-    Process multiple LLM calls concurrently with rate limiting.
-    
+    Builds the coroutine function that runs one prompt input through the chain, sharing
+    the LLM cache and the provider's rate limiter across every call made with it.
+
+    Calls are admitted by the provider's adaptive concurrency limit and requests/tokens
+    per minute buckets. Failed calls are retried with jittered exponential backoff up to
+    the retry budget from rate_limiter.get_retry_config(); rate limit and timeout errors
+    also shrink the provider's concurrency limit. An LLMRouter chain limits and times out
+    each backend it tries itself, so its calls skip the provider limiter and call timeout
+    here and only a failure of every backend counts as a retry.
+
     Args:
         llm_chain: The LLM chain to use
-        professor_info_list: List of CrawlerResult objects with .markdown and .url attributes
-        max_concurrent: Maximum number of concurrent LLM calls
-    
+        max_concurrent: Optional ceiling on concurrent calls made through this invoker
+        cache_scope: Scope from llm_cache.cache_scope, enables the persistent LLM cache
+        provider: LLM provider name, selects the shared rate limiter
+        stats: Optional dictionary that receives llm_succeeded, llm_cache_hits,
+            llm_retried and llm_dropped counts
+        detailed: Return an outcome dictionary (status, data, error, latency_seconds,
+            estimated_tokens, attempts) instead of just the data
+
     Returns:
-        List of processed results
+        Coroutine function (prompt_input, label) -> model_dump() of the result, or None on failure.
+        With detailed=True the coroutine returns the outcome dictionary instead.
     """
-    semaphore = asyncio.Semaphore(max_concurrent)
-    
-    async def process_single(markdown, url):
-        async with semaphore:
-            try:
-                logger.info(f"invoking llm for {url}")
-                data = await llm_chain.ainvoke({"markdown": markdown, "src_url": url})
-                return data, None
-            except Exception as e:
-                logger.error(f"LLM error while extracting info from {url}: {e}")
-                return None, e
-    
-    # Create tasks for all LLM calls
-    tasks = []
-    for professor_info in professor_info_list:
-        markdown = getattr(professor_info, "markdown")
-        src_url = getattr(professor_info, "url")
-        if markdown and src_url:
-            tasks.append(process_single(markdown, src_url))
+    semaphore = asyncio.Semaphore(max_concurrent) if max_concurrent else None
+    cache = get_llm_cache() if cache_scope else None
+    retry_config = get_retry_config()
+    routed = isinstance(llm_chain, LLMRouter)
+    limiter = None if routed else get_rate_limiter(provider)
+    call_timeout = None if routed else retry_config["timeout_seconds"]
+    if stats is None:
+        stats = {}
+    for counter in ("llm_succeeded", "llm_cache_hits", "llm_retried", "llm_dropped"):
+        stats.setdefault(counter, 0)
+
+    async def call_with_retries(prompt_input, label, outcome):
+        for attempt in range(retry_config["max_retries"] + 1):
+            # The batch slot is only held for the call itself, not the backoff sleep
+            async with semaphore or contextlib.nullcontext():
+                if limiter:
+                    await limiter.acquire(outcome["estimated_tokens"])
+                outcome["attempts"] += 1
+                started = time.monotonic()
+                try:
+                    logger.info(f"invoking llm for {label}")
+                    data = await asyncio.wait_for(llm_chain.ainvoke(prompt_input), timeout=call_timeout)
+                    if limiter:
+                        await limiter.concurrency.on_success()
+                    if not data:
+                        outcome["error"] = "LLM returned no structured output"
+                    return data
+                except Exception as e:
+                    outcome["error"] = f"{type(e).__name__}: {e}"
+                    if limiter and is_overload_error(e):
+                        await limiter.concurrency.on_overload(started)
+                    if attempt == retry_config["max_retries"]:
+                        logger.error(f"LLM error while extracting info from {label}, giving up: {e}")
+                        return None
+                    delay = backoff_delay(attempt, retry_config["base_delay_seconds"], retry_config["max_delay_seconds"])
+                    logger.warning(f"LLM error while extracting info from {label}: {e}. Retrying in {delay:.1f}s")
+                    stats["llm_retried"] += 1
+                finally:
+                    if limiter:
+                        await limiter.release()
+            await asyncio.sleep(delay)
+
+    async def process_detailed(prompt_input, label):
+        start = time.monotonic()
+        outcome = {
+            "status": "failed",
+            "data": None,
+            "error": None,
+            "latency_seconds": 0.0,
+            "estimated_tokens": estimate_tokens(json.dumps(prompt_input, default=str)),
+            "attempts": 0,
+        }
+        key = cache_key(cache_scope, prompt_input) if cache else None
+        # SQLite I/O runs off the event loop so cache hits don't stall other requests
+        cached = await asyncio.to_thread(cache.get, key) if cache else None
+        if cached is not None:
+            logger.info(f"LLM cache hit for {label}")
+            stats["llm_cache_hits"] += 1
+            outcome.update(status="cached", data=cached)
         else:
-            logger.warning(f"Skipping professor. No markdown or url found.")
-    # Wait for all tasks to complete
-    results = await asyncio.gather(*tasks, return_exceptions=True)
-    
-    # Process results and maintain order
-    processed_results = []
-    for result in results:
-        if isinstance(result, Exception):
-            logger.error(f"Task failed with exception: {result}")
-            continue
-            
-        data, error = result
-        if data and not error:
-            professor_data = data.model_dump()
-            if professor_data:
-                processed_results.append(professor_data)
-    
-    return processed_results
-
-async def llm_ainvoke_batch_courses(llm_chain, course_info_list, max_concurrent=5):
+            data = await call_with_retries(prompt_input, label, outcome)
+            if data:
+                stats["llm_succeeded"] += 1
+                outcome.update(status="succeeded", data=data.model_dump(), error=None)
+                if cache:
+                    await asyncio.to_thread(cache.set, key, outcome["data"])
+            else:
+                stats["llm_dropped"] += 1
+        outcome["latency_seconds"] = round(time.monotonic() - start, 3)
+        return outcome
+
+    async def process_single(prompt_input, label):
+        return (await process_detailed(prompt_input, label))["data"]
+
+    return process_detailed if detailed else process_single
+
+async def llm_ainvoke_many(llm_chain, inputs, max_concurrent=None, cache_scope=None, labels=None, provider=None, stats=None):
+    """
+    Invoke an LLM chain on many prompt inputs concurrently with rate limiting and retries.
+    A failing input does not affect the others.
+
+    Args:
+        llm_chain: The LLM chain to use
+        inputs: List of prompt input dicts, e.g. {"markdown": ...}
+        max_concurrent: Optional ceiling on concurrent LLM calls for this batch
+        cache_scope: Scope from llm_cache.cache_scope. If given, results are read from and
+            written to the persistent LLM cache.
+        labels: Optional list of names for each input, used in log messages
+        provider: LLM provider name, selects the shared rate limiter
+        stats: Optional dictionary that receives succeeded/cache hit/retried/dropped counts
+
+    Returns:
+        List aligned with inputs holding each result's model_dump(), or None where the call failed
+    """
+    stats = {} if stats is None else stats
+    process_single = llm_invoker(llm_chain, max_concurrent, cache_scope, provider, stats)
+    labels = labels or [f"item {i}" for i in range(len(inputs))]
+    results = await asyncio.gather(*[process_single(prompt_input, label) for prompt_input, label in zip(inputs, labels)])
+    _log_stats(stats)
+    return results
+
+async def llm_astream_many(llm_chain, inputs, max_concurrent=None, cache_scope=None, labels=None, provider=None, stats=None):
+    """
+    Async-generator version of llm_ainvoke_many that yields each result as soon as its
+    call completes rather than waiting for the whole batch.
+
+    Yields:
+        (index, result) pairs in completion order. result is None where the call failed.
+    """
+    stats = {} if stats is None else stats
+    process_single = llm_invoker(llm_chain, max_concurrent, cache_scope, provider, stats)
+    labels = labels or [f"item {i}" for i in range(len(inputs))]
+
+    async def indexed(i, prompt_input, label):
+        return i, await process_single(prompt_input, label)
+
+    tasks = [asyncio.create_task(indexed(i, prompt_input, label)) for i, (prompt_input, label) in enumerate(zip(inputs, labels))]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+        _log_stats(stats)
+    finally:
+        # Stop outstanding calls if the consumer stops early, e.g. a client disconnect
+        for task in tasks:
+            task.cancel()
+
+async def llm_ainvoke_batch_courses(llm_chain, course_info_list, max_concurrent=None, cache_scope=None, provider=None, stats=None):
     """
     Process multiple LLM calls concurrently with rate limiting.
-    
+
     Args:
         llm_chain: The LLM chain to use
-        course_info_list: List of CrawlerResult objects with .markdown and .url attributes
-        max_concurrent: Maximum number of concurrent LLM calls
-    
+        course_info_list: List of markdown strings, one per course block
+        max_concurrent: Optional ceiling on concurrent LLM calls for this batch
+        cache_scope: Scope from llm_cache.cache_scope, enables the persistent LLM cache
+        provider: LLM provider name, selects the shared rate limiter
+        stats: Optional dictionary that receives succeeded/cache hit/retried/dropped counts
+
     Returns:
-        List of processed results
+        List of processed results. Courses whose extraction failed are left out.
     """
-    semaphore = asyncio.Semaphore(max_concurrent)
-    
\ No newline at end of file
+    inputs = [{"markdown": markdown} for markdown in course_info_list]
+    labels = [f"course block {i}" for i in range(len(course_info_list))]
+    results = await llm_ainvoke_many(llm_chain, inputs, max_concurrent, cache_scope, labels, provider, stats)
+
+    failed = sum(1 for result in results if not result)
+    if failed:
+        logger.warning(f"{failed} of {len(results)} course extractions failed")
+    return [result for result in results if result]
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CACHE_PATH = './cache'
+CACHE_FILENAME = 'llm_cache.sqlite'
+DEFAULT_MAX_ENTRIES = 50000
+DEFAULT_TTL_SECONDS = 30 * 24 * 60 * 60  # 30 days
+# A hit only rewrites accessed_at when it is older than this, so most hits are read-only
+ACCESS_UPDATE_INTERVAL_SECONDS = 60 * 60
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _prompt_fingerprint(prompt_template) -> str:
+    """
+    Stable text representation of a prompt template. Uses langchain's serializer when
+    available so that two templates built from the same config produce the same hash.
+    """
+    try:
+        return json.dumps(prompt_template.to_json(), sort_keys=True, default=str)
+    except Exception:
+        return repr(prompt_template)
+
+
+def cache_scope(prompt_template, pydantic_model, model: str) -> str:
+    """
+    Build the cache scope for an extraction chain.
+
+    Args:
+        prompt_template: The prompt template used by the chain.
+        pydantic_model: The pydantic model the chain outputs.
+        model: Name of the LLM model.
+
+    Returns:
+        Hash identifying the (prompt, schema, model) combination.
+    """
+    schema = json.dumps(pydantic_model.model_json_schema(), sort_keys=True)
+    return _sha256("\x1f".join([_prompt_fingerprint(prompt_template), schema, model]))
+
+
+def cache_key(scope: str, inputs: Dict) -> str:
+    """
+    Build the cache key for a single LLM call from its scope and prompt inputs.
+    """
+    return _sha256(scope + json.dumps(inputs, sort_keys=True, default=str))
+
+
+class LLMCache:
+    """
+    Persistent SQLite cache of structured LLM outputs. Entries expire after ttl_seconds and
+    the least recently used entries are evicted once max_entries is exceeded.
+    """
+
+    def __init__(self, path: str, max_entries: int = DEFAULT_MAX_ENTRIES, ttl_seconds: int = DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache (accessed_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Return the cached result for key, or None if missing or expired.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at, accessed_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, created_at, accessed_at = row
+            if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+            # LRU order only needs to be approximate; skip the write (and its fsync) on most hits
+            if now - accessed_at > ACCESS_UPDATE_INTERVAL_SECONDS:
+                self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+            self.hits += 1
+        return json.loads(value)
+
+    def set(self, key: str, value: Dict):
+        """
+        Store a result and evict expired / least recently used entries.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        if self.ttl_seconds:
+            self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+        if self.max_entries:
+            self._conn.execute(
+                """
+                DELETE FROM llm_cache WHERE key IN (
+                    SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,)
+            )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "size": size}
+
+
+_llm_cache: Optional[LLMCache] = None
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """
+    Returns the process-wide LLM cache, or None if caching is disabled via LLM_CACHE_ENABLED=false.
+
+    Configured with LLM_CACHE_PATH, LLM_CACHE_MAX_ENTRIES and LLM_CACHE_TTL_SECONDS.
+    """
+    global _llm_cache
+    if os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+    if _llm_cache is None:
+        path = os.getenv("LLM_CACHE_PATH", os.path.join(CACHE_PATH, CACHE_FILENAME))
+        max_entries = int(os.getenv("LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+        ttl_seconds = int(os.getenv("LLM_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS))
+        _llm_cache = LLMCache(path, max_entries=max_entries, ttl_seconds=ttl_seconds)
+        logger.info(f"LLM cache enabled at {path}")
+    return _llm_cache
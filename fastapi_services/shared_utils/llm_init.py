@@ -1,34 +1,84 @@
 import os
 import asyncio
 import logging
+import threading
 from langchain.chat_models import init_chat_model
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
+from .llm_cache import cache_scope
+
 logger = logging.getLogger(__name__)
 
-#TODO: make this configurable
-LLM_URL = "http://localhost:11435"
+load_dotenv()
+
+DEFAULT_OLLAMA_URL = "http://localhost:11435"
+
+# Chat models and chains are built once per process and reused, so every extraction
+# shares the provider client and its connection pool instead of opening new ones.
+_chat_models = {}
+_chains = {}
+_registry_lock = threading.Lock()
+
+
+def get_chat_model(model, model_provider, base_url=None):
+    """
+    Returns the process-wide chat model for (model, model_provider, base_url), creating it
+    on first use. Ollama models default to OLLAMA_BASE_URL when base_url is not given.
+    """
+    if model_provider == "ollama":
+        base_url = base_url or os.getenv("OLLAMA_BASE_URL", DEFAULT_OLLAMA_URL)
+    key = (model, model_provider, base_url)
+    with _registry_lock:
+        if key not in _chat_models:
+            _chat_models[key] = _build_chat_model(model, model_provider, base_url)
+            logger.info(f"Initialized chat model {model} ({model_provider})")
+        return _chat_models[key]
+
 
-def llm_init(prompt_template, pydantic_model, model, model_provider):
+def _build_chat_model(model, model_provider, base_url):
     if model_provider == "ollama":
-        llm = init_chat_model(
-            model=model, 
+        return init_chat_model(
+            model=model,
             model_provider=model_provider,
-            base_url=LLM_URL
+            base_url=base_url
         )
     elif model_provider == "google-genai":
-        load_dotenv()
         api_key = os.getenv('GOOGLE_API_KEY')
         if not api_key:
             raise ValueError("GOOGLE_API_KEY environment variable is required. Make sure it's set in your .env file.")
-        llm = init_chat_model(
-            model=model, 
+        return init_chat_model(
+            model=model,
             model_provider=model_provider,
             api_key=api_key
         )
-    
+    raise ValueError(f"Unsupported model provider: {model_provider}")
+
+
+def llm_init(prompt_template, pydantic_model, model, model_provider, base_url=None):
+    """
+    Returns the extraction chain prompt_template | model with structured output. Chains are
+    cached by (prompt, pydantic model, model, provider, base_url), so repeated calls with
+    the same arguments return the same chain.
+    """
+    key = (cache_scope(prompt_template, pydantic_model, model), model_provider, base_url)
+    with _registry_lock:
+        chain = _chains.get(key)
+    if chain is not None:
+        return chain
+
+    llm = get_chat_model(model, model_provider, base_url)
     # chain the llm with the structured output
     structured_llm = llm.with_structured_output(pydantic_model)
     llm_chain = prompt_template | structured_llm
-    return llm_chain
+    with _registry_lock:
+        return _chains.setdefault(key, llm_chain)
+
+
+def clear_llm_registry():
+    """
+    Drop every cached chat model and chain, e.g. after rotating API keys.
+    """
+    with _registry_lock:
+        _chat_models.clear()
+        _chains.clear()
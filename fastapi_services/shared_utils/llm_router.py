@@ -0,0 +1,230 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .llm_cache import cache_scope
+from .llm_init import llm_init
+from .prompt_packing import estimate_tokens
+from .rate_limiter import ProviderRateLimiter, get_rate_limiter, is_overload_error
+
+logger = logging.getLogger(__name__)
+
+# Latency assumed for a backend that has not answered yet, so new backends get tried
+DEFAULT_LATENCY_SECONDS = 1.0
+MAX_COOLDOWN_DOUBLINGS = 5
+
+
+def parse_backends(spec: str) -> List[Dict[str, Optional[str]]]:
+    """
+    Parse a comma-separated backend list such as
+    "ollama:llama3.1:8b@http://gpu1:11434,ollama:llama3.1:8b@http://gpu2:11434,google-genai:gemini-2.5-flash-lite".
+
+    Each entry is provider:model, optionally followed by @base_url.
+
+    Returns:
+        List of {"provider", "model", "base_url"} dictionaries.
+    """
+    backends = []
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        provider, _, rest = entry.partition(":")
+        model, _, base_url = rest.partition("@")
+        if not provider or not model:
+            raise ValueError(f"Invalid LLM backend '{entry}', expected provider:model[@base_url]")
+        backends.append({"provider": provider, "model": model, "base_url": base_url or None})
+    if not backends:
+        raise ValueError("No LLM backends configured")
+    return backends
+
+
+def get_router_config() -> Dict[str, float]:
+    """
+    Get router settings: per-backend in-flight cap, base cooldown for failing backends,
+    per-backend call timeout and the latency EWMA smoothing factor.
+    """
+    return {
+        "max_in_flight": int(os.getenv("LLM_ROUTER_MAX_IN_FLIGHT", 8)),
+        "cooldown_seconds": float(os.getenv("LLM_ROUTER_COOLDOWN_SECONDS", 30.0)),
+        "timeout_seconds": float(os.getenv("LLM_ROUTER_BACKEND_TIMEOUT", 45.0)),
+        "ewma_alpha": float(os.getenv("LLM_ROUTER_EWMA_ALPHA", 0.3)),
+    }
+
+
+def routing_labels(backends: List[Dict[str, Optional[str]]]) -> Tuple[str, str]:
+    """
+    Model and provider names to use for the LLM cache scope and rate limiter. A single
+    backend keeps its own names. Several backends are labelled "router"; LLMRouter applies
+    each backend's own provider limiter as it calls it.
+    """
+    if len(backends) == 1:
+        return backends[0]["model"], backends[0]["provider"]
+    return "+".join(sorted({backend["model"] for backend in backends})), "router"
+
+
+def _is_backend_error(error: Exception) -> bool:
+    """
+    Whether an error is the backend's fault (saturated, down, unreachable) rather than
+    the input's, so the call should move to another backend.
+    """
+    message = f"{type(error).__name__} {error}".lower()
+    return is_overload_error(error) or isinstance(error, ConnectionError) or "connect" in message or "unavailable" in message
+
+
+class LLMBackend:
+    """
+    One chain behind the router, with its latency EWMA, in-flight count and cooldown, and
+    the rate limiter of its provider.
+    """
+
+    def __init__(self, name: str, chain, config: Dict[str, float], limiter: ProviderRateLimiter):
+        self.name = name
+        self.chain = chain
+        self.config = config
+        self.limiter = limiter
+        self.latency: Optional[float] = None
+        self.in_flight = 0
+        self.failures = 0
+        self.down_until = 0.0
+
+    def cooling_down(self, now: float) -> bool:
+        return now < self.down_until
+
+    def saturated(self) -> bool:
+        return self.in_flight >= self.config["max_in_flight"] or self.limiter.concurrency.full()
+
+    def weight(self) -> float:
+        return 1 / max(self.latency or DEFAULT_LATENCY_SECONDS, 0.001)
+
+    def record_success(self, latency: float):
+        alpha = self.config["ewma_alpha"]
+        self.latency = latency if self.latency is None else alpha * latency + (1 - alpha) * self.latency
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        cooldown = self.config["cooldown_seconds"] * 2 ** min(self.failures - 1, MAX_COOLDOWN_DOUBLINGS)
+        self.down_until = time.monotonic() + cooldown
+        logger.warning(f"LLM backend {self.name} failed {self.failures} times in a row, cooling down for {cooldown:.0f}s")
+
+    def snapshot(self) -> Dict:
+        return {
+            "name": self.name,
+            "latency_seconds": round(self.latency, 3) if self.latency is not None else None,
+            "in_flight": self.in_flight,
+            "failures": self.failures,
+            "cooling_down": self.cooling_down(time.monotonic()),
+        }
+
+
+class LLMRouter:
+    """
+    Spreads calls across several LLM chains with the same prompt and output schema. Each
+    call goes to a backend picked at random weighted by inverse latency (EWMA), skipping
+    backends that are saturated or cooling down after failures. If the backend is
+    overloaded, times out or is unreachable, the call fails over to the next one.
+
+    Every attempt goes through the backend's provider rate limiter (LLM_<PROVIDER>_RPM,
+    _TPM and adaptive concurrency) and its own timeout, so llm_invoker doesn't put a
+    timeout or limiter around the whole failover chain.
+
+    Exposes ainvoke, so it can be used wherever an llm_init chain is.
+    """
+
+    def __init__(self, backends: List[LLMBackend], config: Dict[str, float]):
+        self.backends = backends
+        self.config = config
+
+    def _order(self) -> List[LLMBackend]:
+        now = time.monotonic()
+        ready = [backend for backend in self.backends if not backend.cooling_down(now) and not backend.saturated()]
+        # Saturated and cooling backends are a last resort, healthiest first
+        rest = sorted(
+            (backend for backend in self.backends if backend not in ready),
+            key=lambda backend: (backend.cooling_down(now), backend.down_until, backend.in_flight)
+        )
+        if not ready:
+            return rest
+        first = random.choices(ready, weights=[backend.weight() for backend in ready])[0]
+        others = sorted((backend for backend in ready if backend is not first), key=lambda backend: -backend.weight())
+        return [first] + others + rest
+
+    async def ainvoke(self, prompt_input, config=None):
+        estimated_tokens = estimate_tokens(json.dumps(prompt_input, default=str))
+        last_error = None
+        for backend in self._order():
+            await backend.limiter.acquire(estimated_tokens)
+            backend.in_flight += 1
+            start = time.monotonic()
+            try:
+                result = await asyncio.wait_for(backend.chain.ainvoke(prompt_input, config), timeout=self.config["timeout_seconds"])
+                backend.record_success(time.monotonic() - start)
+                await backend.limiter.concurrency.on_success()
+                return result
+            except Exception as e:
+                if is_overload_error(e):
+                    await backend.limiter.concurrency.on_overload(start)
+                if not _is_backend_error(e):
+                    raise
+                backend.record_failure()
+                logger.warning(f"LLM backend {backend.name} failed: {type(e).__name__}: {e}. Failing over.")
+                last_error = e
+            finally:
+                backend.in_flight -= 1
+                await backend.limiter.release()
+        raise last_error
+
+    def snapshot(self) -> List[Dict]:
+        return [backend.snapshot() for backend in self.backends]
+
+
+_routers: Dict[Tuple, LLMRouter] = {}
+_routers_lock = threading.Lock()
+
+
+def llm_route(prompt_template, pydantic_model, backends: List[Dict[str, Optional[str]]]):
+    """
+    Build the extraction chain for a list of backends. One backend returns its llm_init
+    chain directly; several return a process-wide LLMRouter, so latency and failure
+    history carry over between requests.
+
+    Args:
+        prompt_template: The prompt template used by every backend.
+        pydantic_model: The pydantic model the chain outputs.
+        backends: Backends from parse_backends.
+
+    Returns:
+        An object with ainvoke, either a chain or an LLMRouter.
+    """
+    if len(backends) == 1:
+        backend = backends[0]
+        return llm_init(prompt_template, pydantic_model, backend["model"], backend["provider"], base_url=backend["base_url"])
+
+    key = (
+        cache_scope(prompt_template, pydantic_model, routing_labels(backends)[0]),
+        tuple((backend["provider"], backend["model"], backend["base_url"]) for backend in backends),
+    )
+    with _routers_lock:
+        router = _routers.get(key)
+    if router is not None:
+        return router
+
+    config = get_router_config()
+    router = LLMRouter([
+        LLMBackend(
+            f"{backend['provider']}:{backend['model']}" + (f"@{backend['base_url']}" if backend["base_url"] else ""),
+            llm_init(prompt_template, pydantic_model, backend["model"], backend["provider"], base_url=backend["base_url"]),
+            config,
+            get_rate_limiter(backend["provider"])
+        )
+        for backend in backends
+    ], config)
+    logger.info(f"Routing LLM calls across {[backend.name for backend in router.backends]}")
+    with _routers_lock:
+        return _routers.setdefault(key, router)
@@ -0,0 +1,54 @@
+from typing import List
+
+# Rough characters-per-token ratio for English text and markup
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate for budgeting prompts without loading a tokenizer.
+    """
+    if not text:
+        return 0
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Cuts text to roughly max_tokens estimated tokens, at the last line break before the
+    limit when there is one.
+    """
+    if not text or estimate_tokens(text) <= max_tokens:
+        return text
+    cut = text[:max_tokens * CHARS_PER_TOKEN]
+    line_end = cut.rfind("\n")
+    return cut[:line_end] if line_end > 0 else cut
+
+
+def pack_blocks(blocks: List[str], max_items: int, max_tokens: int) -> List[List[int]]:
+    """
+    Greedily groups consecutive blocks into packs of at most max_items blocks and
+    max_tokens estimated tokens. A single block larger than the budget gets its own pack.
+
+    Args:
+        blocks: Text blocks to pack, e.g. one per course.
+        max_items: Maximum number of blocks per pack.
+        max_tokens: Token budget per pack.
+
+    Returns:
+        List of packs, each a list of indices into blocks.
+    """
+    packs = []
+    current = []
+    current_tokens = 0
+    for i, block in enumerate(blocks):
+        tokens = estimate_tokens(block)
+        if current and (len(current) >= max_items or current_tokens + tokens > max_tokens):
+            packs.append(current)
+            current = []
+            current_tokens = 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        packs.append(current)
+    return packs
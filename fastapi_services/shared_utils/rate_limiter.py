@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INITIAL_CONCURRENCY = 5
+DEFAULT_MIN_CONCURRENCY = 1
+DEFAULT_MAX_CONCURRENCY = 20
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at rate_per_minute, holding at most one minute of tokens.
+    A rate of 0 disables the limit.
+    """
+
+    def __init__(self, rate_per_minute: float):
+        self.rate_per_minute = rate_per_minute
+        self.capacity = rate_per_minute
+        self._tokens = rate_per_minute
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate_per_minute / 60)
+        self._updated_at = now
+
+    async def acquire(self, amount: float = 1):
+        """
+        Wait until amount tokens are available and take them. Requests larger than the
+        bucket wait for a full bucket instead of blocking forever.
+        """
+        if not self.rate_per_minute:
+            return
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            self._refill()
+            while self._tokens < amount:
+                await asyncio.sleep((amount - self._tokens) * 60 / self.rate_per_minute)
+                self._refill()
+            self._tokens -= amount
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD concurrency limit: grows by roughly one slot per limit's worth of successful calls
+    and halves when the provider signals overload (rate limit or timeout). Like TCP, it
+    halves at most once per window: calls already in flight when the limit was cut were
+    admitted under the old limit, so their errors don't cut it again.
+    """
+
+    def __init__(self, initial: int, minimum: int, maximum: int):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self._in_flight = 0
+        self._decreased_at = float("-inf")
+        self._condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._in_flight < int(self.limit))
+            self._in_flight += 1
+
+    async def release(self):
+        async with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def full(self) -> bool:
+        """
+        Whether acquire would wait for a slot.
+        """
+        return self._in_flight >= int(self.limit)
+
+    async def on_success(self):
+        async with self._condition:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+    async def on_overload(self, started_at: Optional[float] = None):
+        """
+        Halve the limit, unless the failed call started (time.monotonic()) before the last
+        decrease and so belongs to the burst that already caused it.
+        """
+        async with self._condition:
+            if started_at is not None and started_at < self._decreased_at:
+                return
+            self.limit = max(self.minimum, self.limit / 2)
+            self._decreased_at = time.monotonic()
+        logger.warning(f"LLM provider overloaded. Concurrency limit reduced to {int(self.limit)}")
+
+
+class ProviderRateLimiter:
+    """
+    Rate limits for one LLM provider: adaptive concurrency plus requests/minute and
+    tokens/minute buckets, shared by every batch that calls the provider.
+    """
+
+    def __init__(self, provider: str, concurrency: AdaptiveConcurrencyLimiter, requests: TokenBucket, tokens: TokenBucket):
+        self.provider = provider
+        self.concurrency = concurrency
+        self.requests = requests
+        self.tokens = tokens
+
+    async def acquire(self, estimated_tokens: int):
+        await self.requests.acquire(1)
+        await self.tokens.acquire(estimated_tokens)
+        await self.concurrency.acquire()
+
+    async def release(self):
+        await self.concurrency.release()
+
+
+def _env_key(provider: str) -> str:
+    return provider.upper().replace("-", "_")
+
+
+def get_retry_config() -> Dict:
+    """
+    Get retry settings for LLM calls: per-item retry budget, backoff bounds and call timeout.
+    """
+    return {
+        "max_retries": int(os.getenv("LLM_MAX_RETRIES", 3)),
+        "base_delay_seconds": float(os.getenv("LLM_RETRY_BASE_DELAY", 1.0)),
+        "max_delay_seconds": float(os.getenv("LLM_RETRY_MAX_DELAY", 30.0)),
+        "timeout_seconds": float(os.getenv("LLM_CALL_TIMEOUT", 60.0)),
+    }
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """
+    Exponential backoff with jitter for the given retry attempt (0-based).
+    """
+    return min(max_delay, base_delay * 2 ** attempt) * random.uniform(0.5, 1.5)
+
+
+def is_overload_error(error: Exception) -> bool:
+    """
+    Whether an error means the provider is saturated (rate limited or timing out).
+    """
+    if isinstance(error, asyncio.TimeoutError):
+        return True
+    message = f"{type(error).__name__} {error}".lower()
+    return any(signal in message for signal in ("429", "resourceexhausted", "resource exhausted", "rate limit", "quota", "timeout", "timed out"))
+
+
+_rate_limiters: Dict[str, ProviderRateLimiter] = {}
+
+
+def get_rate_limiter(provider: Optional[str]) -> ProviderRateLimiter:
+    """
+    Returns the process-wide rate limiter for a provider, configured from
+    LLM_<PROVIDER>_RPM, LLM_<PROVIDER>_TPM (0 disables) and
+    LLM_<PROVIDER>_{INITIAL,MIN,MAX}_CONCURRENCY, e.g. LLM_GOOGLE_GENAI_RPM.
+    """
+    provider = provider or "default"
+    if provider not in _rate_limiters:
+        key = _env_key(provider)
+        concurrency = AdaptiveConcurrencyLimiter(
+            initial=int(os.getenv(f"LLM_{key}_INITIAL_CONCURRENCY", DEFAULT_INITIAL_CONCURRENCY)),
+            minimum=int(os.getenv(f"LLM_{key}_MIN_CONCURRENCY", DEFAULT_MIN_CONCURRENCY)),
+            maximum=int(os.getenv(f"LLM_{key}_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)),
+        )
+        requests = TokenBucket(float(os.getenv(f"LLM_{key}_RPM", 0)))
+        tokens = TokenBucket(float(os.getenv(f"LLM_{key}_TPM", 0)))
+        _rate_limiters[provider] = ProviderRateLimiter(provider, concurrency, requests, tokens)
+    return _rate_limiters[provider]
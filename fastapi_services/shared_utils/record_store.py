@@ -0,0 +1,145 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from .llm_cache import CACHE_PATH
+
+logger = logging.getLogger(__name__)
+
+# Keys per IN (...) query, under SQLite's default limit of 999 bound variables
+MAX_KEYS_PER_QUERY = 500
+
+
+def content_hash(content: str) -> str:
+    """
+    Hash used to detect whether a crawled record changed since it was stored.
+    """
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class RecordStore:
+    """
+    Persistent SQLite store of previously extracted records, keyed by a stable id such as
+    the record's url. Each record keeps the hash of the content it was extracted from and
+    when it was last seen, so callers can skip re-extracting unchanged records.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS records (
+                key TEXT PRIMARY KEY,
+                content_hash TEXT,
+                value TEXT NOT NULL,
+                seen_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Returns {"content_hash", "value", "seen_at"} for key, or None if it isn't stored.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT content_hash, value, seen_at FROM records WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return {"content_hash": row[0], "value": json.loads(row[1]), "seen_at": row[2]}
+
+    def get_many(self, keys: List[str]) -> Dict[str, Dict]:
+        """
+        Like get for several keys in one query per MAX_KEYS_PER_QUERY keys. Keys that
+        aren't stored are left out of the result.
+        """
+        keys = list(dict.fromkeys(keys))
+        records = {}
+        with self._lock:
+            for start in range(0, len(keys), MAX_KEYS_PER_QUERY):
+                chunk = keys[start:start + MAX_KEYS_PER_QUERY]
+                rows = self._conn.execute(
+                    f"SELECT key, content_hash, value, seen_at FROM records WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+                for key, record_hash, value, seen_at in rows:
+                    records[key] = {"content_hash": record_hash, "value": json.loads(value), "seen_at": seen_at}
+        return records
+
+    def stored_keys(self, keys: List[str]) -> Set[str]:
+        """
+        Returns which of keys are stored, without loading their values.
+        """
+        keys = list(dict.fromkeys(keys))
+        stored = set()
+        with self._lock:
+            for start in range(0, len(keys), MAX_KEYS_PER_QUERY):
+                chunk = keys[start:start + MAX_KEYS_PER_QUERY]
+                rows = self._conn.execute(f"SELECT key FROM records WHERE key IN ({','.join('?' * len(chunk))})", chunk).fetchall()
+                stored.update(row[0] for row in rows)
+        return stored
+
+    def put(self, key: str, value: Dict, content_hash: Optional[str] = None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO records (key, content_hash, value, seen_at) VALUES (?, ?, ?, ?)",
+                (key, content_hash, json.dumps(value), time.time())
+            )
+            self._conn.commit()
+
+    def put_many(self, records: List[Tuple[str, Dict, Optional[str]]]):
+        """
+        Stores (key, value, content_hash) records in one transaction.
+        """
+        if not records:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO records (key, content_hash, value, seen_at) VALUES (?, ?, ?, ?)",
+                [(key, record_hash, json.dumps(value), now) for key, value, record_hash in records]
+            )
+            self._conn.commit()
+
+    def touch(self, keys: List[str]):
+        """
+        Marks records as seen now without changing them.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.executemany("UPDATE records SET seen_at = ? WHERE key = ?", [(now, key) for key in keys])
+            self._conn.commit()
+
+    def seen_since(self, timestamp: float) -> Dict[str, Dict]:
+        """
+        Returns the values of all records seen at or after timestamp, keyed by record key.
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT key, value FROM records WHERE seen_at >= ?", (timestamp,)).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+
+_record_stores: Dict[str, RecordStore] = {}
+
+
+def get_record_store(name: str) -> RecordStore:
+    """
+    Returns the process-wide record store called name, stored under RECORD_STORE_PATH
+    (defaults to the cache directory).
+    """
+    if name not in _record_stores:
+        directory = os.getenv("RECORD_STORE_PATH", CACHE_PATH)
+        _record_stores[name] = RecordStore(os.path.join(directory, f"{name}.sqlite"))
+        logger.info(f"Opened record store {name}")
+    return _record_stores[name]
@@ -0,0 +1,47 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one underlying task. Callers that
+    arrive while a task for their key is running await that task instead of starting
+    their own. A caller that is cancelled (e.g. by a timeout) does not cancel the task
+    for the others.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._tasks
+
+    async def do(self, key: str, function: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run function under key, or join the call already running under key.
+
+        Args:
+            key: Identifies identical calls, e.g. "research:CSCI".
+            function: Coroutine function to run if no call is in flight.
+
+        Returns:
+            The result of the shared call.
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.create_task(function())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            logger.info(f"Joining in-flight call for {key}")
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        # Mark the exception as retrieved when every caller has gone away
+        if not task.cancelled():
+            task.exception()
@@ -1,11 +1,24 @@
 from supabase import create_client, Client
 import os
+import gzip
 import json
-from typing import Dict
+import time
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Set STORAGE_BACKEND=local to read and write snapshots under LOCAL_STORAGE_PATH instead of Supabase
+LOCAL_STORAGE_PATH = './storage'
+GZIP_LEVEL = 6
+
+def get_storage_backend() -> str:
+    return os.getenv("STORAGE_BACKEND", "supabase").lower()
+
+def get_local_path(bucket_name: str, file_path: str) -> str:
+    return os.path.join(os.getenv("LOCAL_STORAGE_PATH", LOCAL_STORAGE_PATH), bucket_name, file_path)
+
 def get_supabase_client() -> Client:
     """
     Creates and returns a Supabase client.
@@ -20,18 +33,136 @@ def get_supabase_client() -> Client:
     return client
 
 
-def save_to_storage(data: list[Dict], bucket_name:str, file_path:str):
-    supabase = get_supabase_client()
+# Stored files are sharded as {source}/{key}/{YYYY-MM-DD}/..., e.g. research/CSCI/2026-10-18/.
+# Each source/key also has a manifest indexing its versions and a small "latest" pointer.
+
+def shard_prefix(source: str, key: str) -> str:
+    """
+    Storage folder of one shard, e.g. research/CSCI.
+    """
+    return f"{source}/{key}"
+
+
+def snapshot_path(source: str, key: str, version: int, date: str) -> str:
+    """
+    Storage path of a gzipped snapshot version, e.g. research/CSCI/2026-10-18/snapshot-v000003.json.gz.
+    """
+    return f"{shard_prefix(source, key)}/{date}/snapshot-v{version:06d}.json.gz"
+
+
+def delta_path(source: str, key: str, version: int, date: str) -> str:
+    """
+    Storage path of the gzipped delta that produced a snapshot version.
+    """
+    return f"{shard_prefix(source, key)}/{date}/delta-v{version:06d}.json.gz"
+
+
+def manifest_path(source: str, key: str) -> str:
+    """
+    Storage path of a shard's manifest, which lists its snapshot and delta versions.
+    """
+    return f"{shard_prefix(source, key)}/manifest.json"
+
+
+def latest_path(source: str, key: str) -> str:
+    """
+    Storage path of a shard's latest pointer: current version, its snapshot path and
+    when it was last checked.
+    """
+    return f"{shard_prefix(source, key)}/latest.json"
+
+
+def save_to_storage(data: Any, bucket_name:str, file_path:str):
+    """
+    Stores data as JSON. Paths ending in .gz are gzip-compressed. Raises if the file
+    couldn't be stored, so callers never point readers at a missing file.
+    """
     json_bytes = json.dumps(data).encode('utf-8')
+    content_type = "application/json"
+    if file_path.endswith(".gz"):
+        json_bytes = gzip.compress(json_bytes, compresslevel=GZIP_LEVEL)
+        content_type = "application/gzip"
 
+    if get_storage_backend() == "local":
+        local_path = get_local_path(bucket_name, file_path)
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        # Write then rename, so readers never see a partly written file
+        with open(f"{local_path}.tmp", "wb") as f:
+            f.write(json_bytes)
+        os.replace(f"{local_path}.tmp", local_path)
+        return
+
+    supabase = get_supabase_client()
     try:
-        response = supabase.storage.from_(bucket_name).upload(
+        supabase.storage.from_(bucket_name).upload(
             path=file_path,
             file=json_bytes,
-            file_options={"upsert":"True", "content-type":"application/json"}
+            file_options={"upsert":"True", "content-type":content_type}
         )
     except Exception as e:
         print(f"Error uploading file: {e}")
+        raise
+
+
+def delete_from_storage(bucket_name: str, file_paths: List[str]):
+    """
+    Deletes stored files. Paths that don't exist are ignored.
+    """
+    if not file_paths:
+        return
+
+    if get_storage_backend() == "local":
+        for file_path in file_paths:
+            local_path = get_local_path(bucket_name, file_path)
+            if os.path.exists(local_path):
+                os.remove(local_path)
+            # Drop the date folder once its last version is gone
+            folder = os.path.dirname(local_path)
+            if os.path.isdir(folder) and not os.listdir(folder):
+                os.rmdir(folder)
+        return
+
+    supabase = get_supabase_client()
+    try:
+        supabase.storage.from_(bucket_name).remove(file_paths)
+    except Exception as e:
+        print(f"Error deleting files: {e}")
+
+
+def _decode(content: bytes, file_path: str) -> bytes:
+    return gzip.decompress(content) if file_path.endswith(".gz") else content
+
+
+def load_from_storage(bucket_name: str, file_path: str) -> Optional[Tuple[Any, float]]:
+    """
+    Loads a stored JSON file, decompressing paths that end in .gz.
+
+    Returns:
+        The stored data and the unix time it was saved, or None if nothing is stored.
+    """
+    if get_storage_backend() == "local":
+        local_path = get_local_path(bucket_name, file_path)
+        if not os.path.exists(local_path):
+            return None
+        with open(local_path, "rb") as f:
+            return json.loads(_decode(f.read(), file_path)), os.path.getmtime(local_path)
+
+    supabase = get_supabase_client()
+    bucket = supabase.storage.from_(bucket_name)
+    folder, _, filename = file_path.rpartition("/")
+    try:
+        entries = bucket.list(folder, {"search": filename})
+        entry = next((item for item in entries if item.get("name") == filename), None)
+        if entry is None:
+            return None
+        data = json.loads(_decode(bucket.download(file_path), file_path))
+    except Exception as e:
+        print(f"Error downloading file: {e}")
+        return None
+
+    updated_at = entry.get("updated_at") or entry.get("created_at")
+    saved_at = datetime.fromisoformat(updated_at.replace("Z", "+00:00")).timestamp() if updated_at else time.time()
+    return data, saved_at
 
 if __name__ == "__main__":
     data = [{
@@ -0,0 +1,72 @@
+import os
+import sys
+
+import pytest
+
+# Add the fastapi_services directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("bs4")
+pytest.importorskip("crawl4ai")
+pytest.importorskip("langchain_core")
+
+from research_extractor import config
+from research_extractor.research_crawler import schema_sections, prefilter_professor_page
+
+NAV = "\n".join(f"- [Link {i}](/page-{i})" for i in range(5))
+
+FULL_PAGE = """
+<html><body>
+<h1 class="field-content">Ada Lovelace</h1>
+<div class="website"><a href="https://ada.example.edu">Website</a></div>
+<h2 class="views-label-field-research-interests">Research Interests</h2>
+<p>Analytical engines; numerical methods</p>
+</body></html>
+"""
+
+# The name matches the CSCI schema, research interests sit under another heading
+PARTIAL_PAGE = """
+<html><body>
+<h1 class="field-content">Ada Lovelace</h1>
+<h3>Areas of study</h3>
+<p>Analytical engines; numerical methods</p>
+</body></html>
+"""
+
+PARTIAL_MARKDOWN = f"""{NAV}
+
+# Ada Lovelace
+
+### Areas of study
+Analytical engines; numerical methods
+"""
+
+
+def test_schema_sections_when_every_field_matches():
+    sections = schema_sections(FULL_PAGE, config.get_professor_profile_schema())
+
+    assert "## Name\nAda Lovelace" in sections
+    assert "## Website\n[Website](https://ada.example.edu)" in sections
+    assert "## Research Interest\nAnalytical engines; numerical methods" in sections
+
+
+def test_schema_sections_empty_when_only_name_matches():
+    assert schema_sections(PARTIAL_PAGE, config.get_professor_profile_schema()) == ""
+
+
+def test_prefilter_keeps_unmatched_fields_on_partial_match():
+    stats = {}
+    prompt = prefilter_professor_page(PARTIAL_PAGE, PARTIAL_MARKDOWN, stats)
+
+    assert stats["pruned_by_schema"] == 0
+    assert "Analytical engines; numerical methods" in prompt
+    assert "Ada Lovelace" in prompt
+    assert "[Link 0]" not in prompt
+
+
+def test_prefilter_prunes_by_schema_on_full_match():
+    stats = {}
+    prompt = prefilter_professor_page(FULL_PAGE, NAV, stats)
+
+    assert stats["pruned_by_schema"] == 1
+    assert prompt.startswith("## Name\nAda Lovelace")
@@ -0,0 +1,37 @@
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+# Add the fastapi_services directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("langchain")
+pytest.importorskip("crawl4ai")
+
+from shared_utils.rate_limiter import AdaptiveConcurrencyLimiter
+
+
+def test_overload_burst_halves_limit_once():
+    async def burst():
+        limiter = AdaptiveConcurrencyLimiter(initial=8, minimum=1, maximum=20)
+        started = time.monotonic()
+        # Three calls admitted together all hit a 429
+        for _ in range(3):
+            await limiter.on_overload(started)
+        return limiter.limit
+
+    assert asyncio.run(burst()) == 4
+
+
+def test_overload_after_decrease_halves_again():
+    async def two_windows():
+        limiter = AdaptiveConcurrencyLimiter(initial=8, minimum=1, maximum=20)
+        await limiter.on_overload(time.monotonic())
+        # A call admitted after the first cut that still fails
+        await limiter.on_overload(time.monotonic())
+        return limiter.limit
+
+    assert asyncio.run(two_windows()) == 2
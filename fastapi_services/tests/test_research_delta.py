@@ -0,0 +1,48 @@
+import os
+import sys
+
+import pytest
+
+# Add the fastapi_services directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("supabase")
+pytest.importorskip("dotenv")
+
+from research_delta import carry_over_failed, diff_research
+
+
+def professor(slug, interests):
+    return {"name": slug.title(), "website": "N/A", "research_interest": interests, "src_url": f"https://cs.wwu.edu/{slug}"}
+
+
+PREVIOUS = [
+    professor("lovelace", ["engines", "numerics"]),
+    professor("hopper", ["compilers"]),
+    professor("turing", ["computability"]),
+]
+
+
+def test_failed_page_is_carried_over_not_removed():
+    # hopper is still listed but the page failed this run; turing left the department
+    faculty_urls = ["https://cs.wwu.edu/lovelace", "https://cs.wwu.edu/hopper"]
+    current = carry_over_failed(PREVIOUS, [professor("lovelace", ["numerics", "engines"])], faculty_urls)
+    delta = diff_research(PREVIOUS, current, faculty_urls)
+
+    assert professor("hopper", ["compilers"]) in current
+    assert delta == {"added": [], "removed": ["https://cs.wwu.edu/turing"], "changed": []}
+
+
+def test_added_and_changed():
+    faculty_urls = [record["src_url"] for record in PREVIOUS] + ["https://cs.wwu.edu/liskov"]
+    current = [
+        professor("lovelace", ["engines"]),
+        professor("hopper", ["compilers"]),
+        professor("turing", ["computability"]),
+        professor("liskov", ["abstraction"]),
+    ]
+    delta = diff_research(PREVIOUS, current, faculty_urls)
+
+    assert delta["added"] == [professor("liskov", ["abstraction"])]
+    assert delta["changed"] == [professor("lovelace", ["engines"])]
+    assert delta["removed"] == []